@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Time known-fault matching: feature extraction for one photo, and a search
+over synthetic indexes of increasing size, coarse (the default) against a
+full scan of every row.
+
+The synthetic rows are perturbed copies of features from generated photos,
+so they keep the low-rank structure of real reference libraries, and each
+generated photo is its own fault. Agreement is the share of queries whose
+coarse match has the full-scan match's fault; shortfall is how much lower
+the coarse match's similarity is, on average.
+
+Usage:
+    python bench_fault_index.py                     # 20k and 50k rows
+    python bench_fault_index.py 5000 100000         # other sizes
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from fault_index import FaultIndex, extract_features, save_index
+
+QUERIES = 200
+
+def synthetic_photo(rng: np.random.Generator, width: int = 1024, height: int = 768) -> Image.Image:
+    """Noisy device-like photo: a coloured casing with a few lit LEDs"""
+    background = tuple(int(value) for value in rng.integers(0, 256, 3))
+    image = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(image)
+    casing = tuple(int(value) for value in rng.integers(0, 256, 3))
+    draw.rectangle((width // 6, height // 3, width * 5 // 6, height * 2 // 3), fill=casing)
+    for i in range(int(rng.integers(1, 5))):
+        colour = [(255, 0, 0), (255, 170, 0), (0, 255, 0), (0, 90, 255)][int(rng.integers(0, 4))]
+        x = width // 4 + i * width // 8
+        draw.ellipse((x, height // 2 - 12, x + 24, height // 2 + 12), fill=colour)
+    noise = Image.effect_noise((width, height), 48).convert("RGB")
+    return Image.blend(image, noise, 0.1)
+
+def synthetic_rows(rng: np.random.Generator, bases: np.ndarray, rows: int) -> Tuple[np.ndarray, List[str]]:
+    """Rows scattered around the base photos' features, each normalized, and their faults"""
+    picks = rng.integers(0, len(bases), rows)
+    vectors = bases[picks] + rng.normal(0, 0.05, (rows, bases.shape[1])).astype(np.float32)
+    vectors = np.clip(vectors, 0, None)
+    vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+    return vectors, [f"fault_{pick}" for pick in picks]
+
+def best_time(func: Callable, runs: int = 5) -> float:
+    """Best wall time of `runs` calls, in seconds"""
+    func()  # warm up
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+def main():
+    """Print extraction time, then search time and recall per index size"""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20000, 50000]
+    rng = np.random.default_rng(0)
+
+    photos = [synthetic_photo(rng) for _ in range(50)]
+    extract_seconds = best_time(lambda: extract_features(photos[0]))
+    print(f"extract_features (1024x768): {extract_seconds * 1000:.2f}ms")
+    bases = np.stack([extract_features(photo) for photo in photos])
+
+    faults = {f"fault_{i}": {"problem_description": "", "dispatch_note": ""} for i in range(len(photos))}
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            vectors, labels = synthetic_rows(rng, bases, rows)
+            queries = list(synthetic_rows(rng, bases, QUERIES)[0])
+            prefix = os.path.join(directory, f"index_{rows}")
+            save_index(prefix, vectors, labels, [str(row) for row in range(rows)], faults)
+
+            index = FaultIndex.load(prefix)
+            with open(prefix + ".json", "r", encoding="utf-8") as f:
+                full = FaultIndex(index.vectors, json.load(f))  # no coarse matrix
+
+            coarse_seconds = best_time(lambda: [index.search(query) for query in queries]) / QUERIES
+            full_seconds = best_time(lambda: [full.search(query) for query in queries]) / QUERIES
+            matches = [(index.search(query)[0], full.search(query)[0]) for query in queries]
+            agreement = sum(coarse["fault"] == exact["fault"] for coarse, exact in matches) / QUERIES
+            shortfall = sum(exact["similarity"] - coarse["similarity"] for coarse, exact in matches) / QUERIES
+            print(f"{rows:>7} rows  coarse {coarse_seconds * 1000:6.2f}ms  "
+                  f"full scan {full_seconds * 1000:6.2f}ms  "
+                  f"agreement {agreement:.1%}  shortfall {shortfall:.4f}")
+
+if __name__ == "__main__":
+    main()
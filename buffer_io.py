@@ -0,0 +1,65 @@
+"""
+Zero-copy file-like access to in-memory buffers.
+
+io.BytesIO copies anything that is not a bytes object, so wrapping a
+bytearray or memoryview in it duplicates the whole image. BufferReader reads
+straight from the underlying buffer instead, which lets PIL (decoding) and
+requests (uploading to the classifier) consume a memoryview in place.
+"""
+
+import io
+from typing import Union
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable file object over a bytes-like buffer."""
+
+    def __init__(self, buffer: BufferLike):
+        super().__init__()
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        # Slice the view directly; RawIOBase.read would go through an extra bytearray
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._position + size)
+        start = min(self._position, end)
+        self._position = end
+        return self._view[start:end].tobytes()
+
+    def readinto(self, b) -> int:
+        chunk = self._view[self._position:self._position + len(b)]
+        n = len(chunk)
+        b[:n] = chunk
+        self._position += n
+        return n
+
+def open_buffer(buffer: BufferLike) -> io.RawIOBase:
+    """File object over `buffer` without copying it."""
+    if isinstance(buffer, bytes):
+        # BytesIO shares the storage of a bytes object until it is written to
+        return io.BytesIO(buffer)
+    return BufferReader(buffer)
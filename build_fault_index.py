@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Build the visual fault index used by the API for problem detection
+
+The reference library is a directory with one subdirectory per fault,
+holding example photos of that fault, plus an optional faults.json with the
+text returned when a photo matches:
+
+    reference_faults/
+    ├── faults.json
+    ├── router_red_light/
+    │   ├── IMG_0001.jpg
+    │   └── ...
+    └── ont_cracked/
+        └── ...
+
+faults.json maps each subdirectory name to its response fields:
+
+    {
+      "router_red_light": {
+        "problem_detected": true,
+        "problem_description": "Red internet light, unable to connect to internet",
+        "dispatch_note": "..."
+      },
+      "router_green_light": {"problem_detected": false}
+    }
+
+Usage:
+    python build_fault_index.py reference_faults/ --output fault_index
+
+This writes fault_index.npy, fault_index.coarse.npy and fault_index.json;
+point FAULT_INDEX_PATH at the prefix ("fault_index") to enable matching.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import settings
+from fault_index import extract_features, save_index, FEATURE_DIMENSIONS
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+
+def load_fault_definitions(reference_dir: str, fault_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Read faults.json, filling in a default definition for any fault
+    directory it does not describe
+    """
+    definitions: Dict[str, Dict[str, Any]] = {}
+    path = os.path.join(reference_dir, "faults.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            definitions = json.load(f)
+
+    faults = {}
+    for name in fault_names:
+        definition = definitions.get(name, {})
+        if not definition:
+            print(f"⚠️  No faults.json entry for '{name}', using a generic description")
+        faults[name] = {
+            "problem_detected": definition.get("problem_detected", True),
+            "problem_description": definition.get("problem_description", name.replace("_", " ").capitalize()),
+            "dispatch_note": definition.get("dispatch_note"),
+        }
+    return faults
+
+def list_references(reference_dir: str) -> List[Tuple[str, str]]:
+    """(fault name, image path) for every reference image, in a stable order"""
+    references = []
+    for fault in sorted(os.listdir(reference_dir)):
+        fault_dir = os.path.join(reference_dir, fault)
+        if not os.path.isdir(fault_dir):
+            continue
+        for root, _, files in os.walk(fault_dir):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    references.append((fault, os.path.join(root, name)))
+    return references
+
+def image_features(path: str) -> Optional[np.ndarray]:
+    """
+    Features of one reference image, after the same RGB conversion and
+    downscaling the API applies to uploads
+    """
+    try:
+        with Image.open(path) as image:
+            image = image.convert("RGB")
+            if max(image.size) > settings.MAX_IMAGE_DIMENSION:
+                image.thumbnail((settings.MAX_IMAGE_DIMENSION, settings.MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
+            return extract_features(image)
+    except Exception as e:
+        print(f"❌ Skipping {path}: {str(e)}")
+        return None
+
+def build(reference_dir: str, output_prefix: str, workers: int) -> int:
+    """Compute features for the whole library and save the index. Returns the number of references."""
+    references = list_references(reference_dir)
+    if not references:
+        print(f"❌ No reference images found under {reference_dir}")
+        return 0
+
+    fault_names = sorted({fault for fault, _ in references})
+    faults = load_fault_definitions(reference_dir, fault_names)
+    print(f"📚 {len(references)} reference images across {len(fault_names)} faults")
+
+    vectors = np.empty((len(references), FEATURE_DIMENSIONS), dtype=np.float32)
+    labels: List[str] = []
+    sources: List[str] = []
+    row = 0
+
+    start = time.perf_counter()
+    with Pool(processes=workers) as pool:
+        paths = [path for _, path in references]
+        for (fault, path), features in zip(references, pool.imap(image_features, paths, chunksize=16)):
+            if features is None:
+                continue
+            vectors[row] = features
+            labels.append(fault)
+            sources.append(os.path.relpath(path, reference_dir))
+            row += 1
+
+    save_index(output_prefix, vectors[:row], labels, sources, faults)
+    print(f"✅ Indexed {row} images in {time.perf_counter() - start:.1f}s -> {output_prefix}.npy / {output_prefix}.json")
+    return row
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Build the visual fault index from a reference image library")
+    parser.add_argument("reference_dir", help="Directory with one subdirectory of photos per fault")
+    parser.add_argument("--output", "-o", default="fault_index",
+                        help="Output path prefix for the .npy and .json files (default: fault_index)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.reference_dir):
+        print(f"❌ Reference directory not found: {args.reference_dir}")
+        sys.exit(1)
+
+    if not build(args.reference_dir, args.output, args.workers):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Offline bulk reprocessing for the Telecom Device Identifier pipeline
+
+Runs the same stages as POST /identify (image normalization, the photo
+quality gate, known-fault matching, Hugging Face classification, Tesseract
+OCR, filename diagnostics) directly against files on disk, without going
+through HTTP.
+
+Usage:
+    python bulk_identify.py photos/ --output results.jsonl
+    python bulk_identify.py manifest.txt --output results.jsonl --workers 8
+    python bulk_identify.py photos/ --output results.jsonl --no-classify
+
+Results are streamed to the output file as one JSON object per line. Progress
+is checkpointed to <output>.checkpoint, so re-running the same command after an
+interruption resumes where the previous run stopped.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+STAGES = ("read", "preprocess", "screen", "classify", "ocr")
+
+# Per-worker pipeline state, set up once by _init_worker in each pool process
+_worker_state: Dict[str, Any] = {}
+
+def iter_image_paths(source: str) -> Iterator[str]:
+    """
+    Lazily yield image paths from a directory tree or a manifest file.
+
+    Directories are walked depth-first with entries sorted by name, so the
+    order is stable between runs (required for resuming from a checkpoint).
+    A manifest is a text file with one image path per line; blank lines and
+    lines starting with '#' are ignored.
+    """
+    if os.path.isdir(source):
+        stack = [source]
+        while stack:
+            directory = stack.pop()
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+            subdirs = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                    yield entry.path
+            # Push in reverse so directories are visited in sorted order
+            stack.extend(reversed(subdirs))
+    else:
+        with open(source, "r", encoding="utf-8") as manifest:
+            for line in manifest:
+                path = line.strip()
+                if path and not path.startswith("#"):
+                    yield path
+
+def load_checkpoint(checkpoint_path: str) -> Dict[str, int]:
+    """Load a checkpoint, or return an empty one if none exists."""
+    if not os.path.exists(checkpoint_path):
+        return {"completed": 0, "output_offset": 0}
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(checkpoint_path: str, completed: int, output_offset: int) -> None:
+    """Atomically write the checkpoint next to the output file."""
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"completed": completed, "output_offset": output_offset}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+def _init_worker(classify: bool, tesseract_cmd: Optional[str], verbose: bool) -> None:
+    """
+    Pool initializer: import the pipeline once per process and give each
+    worker its own classifier session and Tesseract configuration.
+    """
+    if not verbose:
+        # The pipeline functions print per-image diagnostics; keep workers quiet
+        sys.stdout = open(os.devnull, "w")
+
+    import pytesseract
+    import main
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    _worker_state["main"] = main
+    _worker_state["hf_service"] = main.HuggingFaceService() if classify else None
+
+def check_tesseract(tesseract_cmd: Optional[str]) -> Optional[str]:
+    """
+    Make sure Tesseract can be started with the configuration the workers
+    will use. Returns an error message, or None if it works.
+    """
+    import pytesseract
+    import main  # sets the default tesseract_cmd
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        return f"{pytesseract.pytesseract.tesseract_cmd}: {str(e)}"
+    return None
+
+def is_error(record: Dict[str, Any]) -> bool:
+    """True if the image failed, including OCR failures reported in device_info."""
+    return record.get("status") == "error" or bool((record.get("device_info") or {}).get("error"))
+
+def _process_one(path: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run the identification pipeline on one file.
+
+    Returns the result record and the time spent in each stage (seconds).
+    """
+    main = _worker_state["main"]
+    hf_service = _worker_state["hf_service"]
+    timings = dict.fromkeys(STAGES, 0.0)
+    filename = os.path.basename(path)
+
+    try:
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            file_content = f.read()
+        timings["read"] = time.perf_counter() - start
+
+        if len(file_content) > main.settings.MAX_FILE_SIZE:
+            raise main.HTTPException(status_code=400, detail="File size must be less than 10MB")
+
+        start = time.perf_counter()
+        processed_image_bytes, processed_image = main.preprocess_image_buffer(file_content)
+        del file_content
+        timings["preprocess"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        quality, fault_match = main.screen_photo(processed_image)
+        timings["screen"] = time.perf_counter() - start
+
+        ocr_info = None
+        if main.photo_rejected(quality):
+            results = main.retake_photo_results(quality)
+        else:
+            results = {"status": "skipped", "predictions": []}
+            if hf_service is not None:
+                start = time.perf_counter()
+                results = hf_service.classify_image(processed_image_bytes)
+                timings["classify"] = time.perf_counter() - start
+
+            # OCR reads the decoded image instead of decoding the JPEG again
+            start = time.perf_counter()
+            ocr_info = main.extract_device_info_from_image(processed_image)
+            timings["ocr"] = time.perf_counter() - start
+
+        record = main.build_response_for_filename_simple(
+            filename,
+            filename,
+            len(processed_image_bytes),
+            hf_service.model_id if hf_service is not None else None,
+            results,
+        )
+        main.apply_screening(record, quality, fault_match)
+        if ocr_info is not None:
+            record["device_info"] = ocr_info
+    except main.HTTPException as e:
+        record = {"filename": filename, "status": "error", "error": e.detail}
+    except Exception as e:
+        record = {"filename": filename, "status": "error", "error": str(e)}
+
+    record["path"] = path
+    return record, timings
+
+def run(
+    source: str,
+    output_path: str,
+    workers: int,
+    classify: bool = True,
+    tesseract_cmd: Optional[str] = None,
+    checkpoint_every: int = 100,
+    chunksize: int = 4,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """
+    Process every image under `source`, appending results to `output_path`.
+
+    Results are written in input order, so a checkpoint is just the number of
+    inputs consumed plus the byte offset of the output at that point. On resume
+    the output is truncated back to that offset (dropping any lines written
+    after the last checkpoint) and the first `completed` inputs are skipped.
+
+    Returns a summary with totals, throughput and per-stage time.
+    """
+    checkpoint_path = output_path + ".checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path)
+    completed = checkpoint["completed"]
+
+    if completed:
+        print(f"↩️  Resuming after {completed} images")
+
+    paths = islice(iter_image_paths(source), completed, None)
+    stage_totals = dict.fromkeys(STAGES, 0.0)
+    processed = 0
+    errors = 0
+    retakes = 0
+    start = time.perf_counter()
+
+    mode = "r+b" if os.path.exists(output_path) else "wb"
+    with open(output_path, mode) as output:
+        output.seek(checkpoint["output_offset"])
+        output.truncate()
+
+        with Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(classify, tesseract_cmd, verbose),
+        ) as pool:
+            # imap keeps results in input order, which is what makes the
+            # checkpoint a simple counter
+            for record, timings in pool.imap(_process_one, paths, chunksize=chunksize):
+                output.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                processed += 1
+                if is_error(record):
+                    errors += 1
+                elif record.get("status") == "retake_photo":
+                    retakes += 1
+                for stage, seconds in timings.items():
+                    stage_totals[stage] += seconds
+
+                if processed % checkpoint_every == 0:
+                    output.flush()
+                    os.fsync(output.fileno())
+                    save_checkpoint(checkpoint_path, completed + processed, output.tell())
+                    elapsed = time.perf_counter() - start
+                    print(f"  {completed + processed} images ({processed / elapsed:.1f} img/s)")
+
+        output.flush()
+        os.fsync(output.fileno())
+        save_checkpoint(checkpoint_path, completed + processed, output.tell())
+
+    elapsed = time.perf_counter() - start
+    return {
+        "processed": processed,
+        "errors": errors,
+        "retakes": retakes,
+        "total_completed": completed + processed,
+        "elapsed_seconds": elapsed,
+        "images_per_second": processed / elapsed if elapsed > 0 else 0.0,
+        "stage_seconds": stage_totals,
+    }
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    """Print throughput and per-stage timing for a finished run."""
+    processed = summary["processed"]
+    print("=" * 60)
+    print(f"✅ Processed {processed} images in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['images_per_second']:.2f} img/s), {summary['errors']} errors, "
+          f"{summary['retakes']} rejected by the quality gate")
+    print(f"   Total completed (including previous runs): {summary['total_completed']}")
+    print("   Per-stage time (summed across workers):")
+    for stage, seconds in summary["stage_seconds"].items():
+        per_image = (seconds / processed * 1000) if processed else 0.0
+        print(f"     {stage:<10} {seconds:10.1f}s total  {per_image:8.1f} ms/image")
+    print("=" * 60)
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(
+        description="Run the device identification pipeline over a directory or manifest of images"
+    )
+    parser.add_argument("source", help="Directory of images, or a manifest file with one path per line")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file to write results to")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--no-classify", action="store_true",
+                        help="Skip the Hugging Face classification stage (OCR only)")
+    parser.add_argument("--tesseract-cmd", help="Path to the tesseract executable used by workers")
+    parser.add_argument("--checkpoint-every", type=int, default=100,
+                        help="Write a checkpoint every N images (default: 100)")
+    parser.add_argument("--chunksize", type=int, default=4,
+                        help="Images handed to a worker at a time (default: 4)")
+    parser.add_argument("--verbose", action="store_true", help="Show per-image pipeline output")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ Source not found: {args.source}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Telecom Device Identifier - Bulk Reprocessing")
+    print("=" * 60)
+
+    tesseract_error = check_tesseract(args.tesseract_cmd)
+    if tesseract_error:
+        print(f"❌ Tesseract could not be started ({tesseract_error}); use --tesseract-cmd to point at it")
+        sys.exit(1)
+
+    print(f"📂 Source: {args.source}")
+    print(f"📝 Output: {args.output}")
+    print(f"⚙️  Workers: {args.workers}")
+
+    summary = run(
+        args.source,
+        args.output,
+        workers=args.workers,
+        classify=not args.no_classify,
+        tesseract_cmd=args.tesseract_cmd,
+        checkpoint_every=args.checkpoint_every,
+        chunksize=args.chunksize,
+        verbose=args.verbose,
+    )
+    print_summary(summary)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrupted - re-run the same command to resume from the last checkpoint")
+        sys.exit(130)
@@ -29,7 +29,58 @@ class Settings:
     MAX_IMAGE_DIMENSION: int = 1024
     JPEG_QUALITY: int = 85
     
+    # Optional visual fault index built by build_fault_index.py (path prefix
+    # of the .npy/.json pair) and the cosine similarity needed for a match
+    FAULT_INDEX_PATH: Optional[str] = os.getenv("FAULT_INDEX_PATH")
+    FAULT_MATCH_MIN_SIMILARITY: float = float(os.getenv("FAULT_MATCH_MIN_SIMILARITY", "0.92"))
+    
+    # Live stream: frames whose mean grayscale difference from the last
+    # processed frame is below this fraction (0-1) are skipped
+    STREAM_DEDUP_THRESHOLD: float = float(os.getenv("STREAM_DEDUP_THRESHOLD", "0.03"))
+    
+    # Video clip ingestion (/identify/video)
+    MAX_VIDEO_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    VIDEO_TOP_K: int = int(os.getenv("VIDEO_TOP_K", "3"))
+    VIDEO_MAX_TOP_K: int = 8
+    # Decoding stops after this many frames (about 10s at 30fps)
+    VIDEO_MAX_FRAMES: int = int(os.getenv("VIDEO_MAX_FRAMES", "300"))
+    # Score every Nth decoded frame
+    VIDEO_FRAME_STRIDE: int = int(os.getenv("VIDEO_FRAME_STRIDE", "2"))
+    # Minimum time between the frames kept from a clip, so they are
+    # different views rather than near-identical neighbours
+    VIDEO_MIN_FRAME_GAP_SECONDS: float = float(os.getenv("VIDEO_MIN_FRAME_GAP_SECONDS", "0.5"))
+    
+    # Quality gate: reject unusable photos before classification and OCR.
+    # Sharpness is Laplacian variance, brightness/contrast are 0-255 gray levels.
+    QUALITY_GATE_ENABLED: bool = os.getenv("QUALITY_GATE_ENABLED", "true").lower() == "true"
+    QUALITY_MIN_SHARPNESS: float = float(os.getenv("QUALITY_MIN_SHARPNESS", "60"))
+    QUALITY_MIN_BRIGHTNESS: float = float(os.getenv("QUALITY_MIN_BRIGHTNESS", "40"))
+    QUALITY_MAX_BRIGHTNESS: float = float(os.getenv("QUALITY_MAX_BRIGHTNESS", "220"))
+    # Maximum share of pixels clipped to black or white
+    QUALITY_MAX_CLIPPED_FRACTION: float = float(os.getenv("QUALITY_MAX_CLIPPED_FRACTION", "0.5"))
+    QUALITY_MIN_LABEL_CONTRAST: float = float(os.getenv("QUALITY_MIN_LABEL_CONTRAST", "20"))
+    
     # API timeout settings
     HUGGINGFACE_TIMEOUT: int = 30
+    
+    # Overall time budget per request; clients can ask for less (or more, up
+    # to the maximum) with an X-Request-Deadline header in seconds
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "45"))
+    REQUEST_MAX_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_MAX_DEADLINE_SECONDS", "120"))
+    
+    # Optional device catalog (CSV or JSON) used to correct OCR'd model numbers
+    DEVICE_CATALOG_PATH: Optional[str] = os.getenv("DEVICE_CATALOG_PATH")
+    # Maximum OCR-weighted edit distance for snapping to a catalog model
+    DEVICE_CATALOG_MAX_DISTANCE: int = int(os.getenv("DEVICE_CATALOG_MAX_DISTANCE", "1"))
+    
+    # Memory budget for images being processed concurrently in this process
+    MEMORY_BUDGET_BYTES: int = int(os.getenv("MEMORY_BUDGET_MB", "512")) * 1024 * 1024
+    # Seconds a request waits for free budget before being rejected with 503
+    MEMORY_BUDGET_WAIT_TIMEOUT: float = float(os.getenv("MEMORY_BUDGET_WAIT_TIMEOUT", "10"))
+    
+    # Profiling/debug endpoints are disabled unless a token is set
+    PROFILING_TOKEN: Optional[str] = os.getenv("PROFILING_TOKEN")
+    PROFILING_OUTPUT_DIR: str = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+    PROFILING_MAX_SECONDS: float = 300.0
 
 settings = Settings()
@@ -0,0 +1,126 @@
+"""
+Per-request deadlines.
+
+Every request gets a time budget (REQUEST_DEADLINE_SECONDS, or the
+X-Request-Deadline header). Each pipeline stage is given only the time that
+is left: the classifier call and Tesseract get it as their timeouts, so work
+abandoned after the deadline stops on its own instead of holding a worker.
+The request itself is cancelled when the deadline passes or the client
+disconnects, and a partial response lists the stages that finished.
+"""
+
+import asyncio
+import math
+import time
+from typing import Optional, Dict, Any, List, Awaitable, TypeVar
+
+from config import settings
+
+T = TypeVar("T")
+
+# How often to check whether the client has gone away
+DISCONNECT_POLL_INTERVAL = 0.25
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of its time budget."""
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before the response is ready."""
+
+class Deadline:
+    """
+    Time budget for one request, plus a record of the stages that finished
+    within it and any results worth returning if it runs out.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self.completed_stages: List[Dict[str, Any]] = []
+        self.partial_results: Dict[str, Any] = {}
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def stage_timeout(self, cap: Optional[float] = None) -> float:
+        """
+        Time the next stage may take: what is left of the budget, capped at
+        `cap`. Raises DeadlineExceeded if nothing is left.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        return min(remaining, cap) if cap is not None else remaining
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.completed_stages.append({"stage": stage, "seconds": round(seconds, 4)})
+
+    def summary(self) -> Dict[str, Any]:
+        """Budget, elapsed time and completed stages, for responses."""
+        return {
+            "budget_seconds": self.seconds,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 4),
+            "completed_stages": list(self.completed_stages),
+        }
+
+def deadline_from_header(value: Optional[str]) -> Deadline:
+    """
+    Build a Deadline from an X-Request-Deadline header value in seconds,
+    falling back to REQUEST_DEADLINE_SECONDS and clamped to
+    REQUEST_MAX_DEADLINE_SECONDS. Raises ValueError for a malformed,
+    non-positive or non-finite (nan, inf) value.
+    """
+    seconds = settings.REQUEST_DEADLINE_SECONDS
+    if value:
+        seconds = float(value)
+        if not math.isfinite(seconds) or seconds <= 0:
+            raise ValueError("Deadline must be a positive finite number")
+    return Deadline(min(seconds, settings.REQUEST_MAX_DEADLINE_SECONDS))
+
+async def _wait_for_disconnect(request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+def _discard_result(task: asyncio.Task) -> None:
+    # Abandoned tasks may still fail once their thread finishes; nobody is waiting for that
+    if not task.cancelled():
+        task.exception()
+
+async def run_until_deadline(work: Awaitable[T], deadline: Deadline, request=None) -> T:
+    """
+    Await `work`, cancelling it if the deadline passes or `request`'s client
+    disconnects first.
+
+    A stage running in a worker thread cannot be interrupted, so on
+    cancellation this returns immediately and the thread winds down on its
+    own, bounded by the stage timeout it was given.
+
+    Raises:
+        DeadlineExceeded: the deadline passed first
+        ClientDisconnected: the client went away first
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request)) if request is not None else None
+    waiting = {task} if watcher is None else {task, watcher}
+
+    try:
+        done, _ = await asyncio.wait(waiting, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            return task.result()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+    task.cancel()
+    task.add_done_callback(_discard_result)
+    if watcher is not None and watcher in done:
+        raise ClientDisconnected()
+    raise DeadlineExceeded()
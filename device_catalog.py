@@ -0,0 +1,177 @@
+"""
+Device catalog with OCR-tolerant model number lookup.
+
+OCR regularly confuses look-alike characters on device labels (O/0, I/1,
+S/5, B/8, ...), so a model number read off a label often does not exist. The
+catalog snaps each OCR candidate to the nearest known model number.
+
+Index layout (symmetric delete):
+    - Every model number is normalized: uppercased, separators removed and
+      look-alike characters folded to one representative, so pure confusion
+      errors become exact key matches.
+    - For each normalized key, all variants with up to `max_distance`
+      characters deleted are stored in a dict pointing back at the entry.
+    - A lookup generates the same deletes for the query and intersects with
+      the dict, giving a small candidate set that is then ranked with an edit
+      distance where look-alike substitutions are cheap.
+
+Lookups touch O(len(query) ** max_distance) dict keys regardless of catalog
+size, so they stay in the microsecond range for 100k+ entries.
+"""
+
+import csv
+import json
+import os
+from itertools import combinations
+from typing import Optional, Dict, Any, List, Iterable, Set, Union
+
+# Characters OCR confuses on printed labels, folded to one representative
+OCR_CONFUSIONS = {
+    "O": "0", "Q": "0", "D": "0",
+    "I": "1", "L": "1", "|": "1",
+    "S": "5",
+    "B": "8",
+    "Z": "2",
+    "G": "6",
+}
+_FOLD_TABLE = str.maketrans(OCR_CONFUSIONS)
+_STRIP_CHARS = str.maketrans("", "", "-_ ./")
+
+# Cost of substituting one look-alike character for another
+CONFUSION_COST = 0.25
+
+def clean_model_number(value: str) -> str:
+    """Uppercase and drop separators, keeping the original characters."""
+    return value.upper().translate(_STRIP_CHARS)
+
+def normalize_model_number(value: str) -> str:
+    """Cleaned model number with look-alike characters folded together."""
+    return clean_model_number(value).translate(_FOLD_TABLE)
+
+def _deletes(key: str, max_distance: int) -> Set[str]:
+    """All variants of `key` with up to `max_distance` characters removed."""
+    variants = {key}
+    for count in range(1, min(max_distance, len(key) - 1) + 1):
+        for positions in combinations(range(len(key)), count):
+            variants.add("".join(ch for i, ch in enumerate(key) if i not in positions))
+    return variants
+
+def ocr_distance(a: str, b: str) -> float:
+    """
+    Damerau-Levenshtein (optimal string alignment) distance where
+    substituting look-alike characters costs CONFUSION_COST instead of 1.
+    """
+    rows, cols = len(a) + 1, len(b) + 1
+    previous_previous: List[float] = []
+    previous = [float(j) for j in range(cols)]
+    for i in range(1, rows):
+        current = [float(i)] + [0.0] * (cols - 1)
+        for j in range(1, cols):
+            ca, cb = a[i - 1], b[j - 1]
+            if ca == cb:
+                substitution = 0.0
+            elif ca.translate(_FOLD_TABLE) == cb.translate(_FOLD_TABLE):
+                substitution = CONFUSION_COST
+            else:
+                substitution = 1.0
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + substitution,
+            )
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class DeviceCatalog:
+    """
+    In-memory catalog of known devices with approximate model number lookup.
+
+    Entries are dicts with "model_number", "vendor" and "product_type".
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]], max_distance: int = 1):
+        self.max_distance = max_distance
+        self.entries: List[Dict[str, Any]] = []
+        self._cleaned: List[str] = []
+        # Delete variant -> entry index, or list of indices when shared
+        self._index: Dict[str, Union[int, List[int]]] = {}
+
+        for entry in entries:
+            model_number = (entry.get("model_number") or "").strip()
+            if not model_number:
+                continue
+            position = len(self.entries)
+            self.entries.append({
+                "model_number": model_number,
+                "vendor": entry.get("vendor") or None,
+                "product_type": entry.get("product_type") or None,
+            })
+            self._cleaned.append(clean_model_number(model_number))
+            for variant in _deletes(normalize_model_number(model_number), max_distance):
+                existing = self._index.get(variant)
+                if existing is None:
+                    self._index[variant] = position
+                elif isinstance(existing, list):
+                    existing.append(position)
+                else:
+                    self._index[variant] = [existing, position]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, candidate: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the catalog entry closest to an OCR'd model number.
+
+        Args:
+            candidate: Model number as read by OCR
+
+        Returns:
+            None if nothing is within max_distance, otherwise a dictionary:
+                - model_number: catalog model number
+                - vendor: str or None
+                - product_type: str or None
+                - distance: OCR-weighted edit distance to the candidate
+        """
+        cleaned = clean_model_number(candidate)
+        if not cleaned:
+            return None
+
+        positions: Set[int] = set()
+        for variant in _deletes(cleaned.translate(_FOLD_TABLE), self.max_distance):
+            found = self._index.get(variant)
+            if found is None:
+                continue
+            if isinstance(found, list):
+                positions.update(found)
+            else:
+                positions.add(found)
+
+        if not positions:
+            return None
+
+        # Closest match wins; ties go to the earlier catalog entry so results are stable
+        best_distance, best = min(
+            (ocr_distance(cleaned, self._cleaned[position]), position) for position in positions
+        )
+        if best_distance > self.max_distance:
+            return None
+
+        return {**self.entries[best], "distance": best_distance}
+
+def load_catalog(path: str, max_distance: int = 1) -> DeviceCatalog:
+    """
+    Load a device catalog from a CSV or JSON file.
+
+    CSV files need a header row with model_number, vendor and product_type
+    columns. JSON files hold a list of objects with the same keys.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if extension == ".json":
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+    return DeviceCatalog(entries, max_distance=max_distance)
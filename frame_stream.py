@@ -0,0 +1,63 @@
+"""
+Helpers for the live-camera identification stream.
+
+Frames arrive faster than the pipeline can process them, and consecutive
+frames from a handheld camera are usually near-identical. The stream keeps
+only the newest unprocessed frame (LatestFrameSlot) and skips frames whose
+tiny grayscale fingerprint barely differs from the last processed one.
+"""
+
+import asyncio
+import io
+from typing import Optional
+
+from PIL import Image, ImageChops, ImageStat
+
+FINGERPRINT_SIZE = (32, 32)
+
+def frame_fingerprint(frame_bytes: bytes) -> Image.Image:
+    """
+    Downscaled grayscale thumbnail of a frame, used for change detection.
+
+    For JPEG frames draft() lets the decoder skip most of the full-resolution
+    work, so this costs a fraction of a full decode.
+    """
+    image = Image.open(io.BytesIO(frame_bytes))
+    image.draft("L", (FINGERPRINT_SIZE[0] * 4, FINGERPRINT_SIZE[1] * 4))
+    return image.convert("L").resize(FINGERPRINT_SIZE, Image.Resampling.BILINEAR)
+
+def frame_difference(a: Image.Image, b: Image.Image) -> float:
+    """Mean absolute pixel difference between two fingerprints, from 0.0 to 1.0."""
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0] / 255.0
+
+class LatestFrameSlot:
+    """
+    Single-slot mailbox holding the newest frame not yet processed.
+
+    put() overwrites any frame still waiting, so the consumer always works
+    on the most recent frame and never falls behind the camera.
+    """
+
+    def __init__(self):
+        self._frame: Optional[bytes] = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.superseded = 0
+
+    def put(self, frame: bytes) -> None:
+        if self._frame is not None:
+            self.superseded += 1
+        self._frame = frame
+        self._ready.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[bytes]:
+        """Wait for the next frame; returns None once closed and drained."""
+        await self._ready.wait()
+        frame, self._frame = self._frame, None
+        if not self._closed:
+            self._ready.clear()
+        return frame
@@ -23,17 +23,67 @@ export interface DeviceIdentificationResponse {
   problem_detected?: boolean;
   problem_description?: string;
   dispatch_note?: string;
+  // Quality gate (status is 'retake_photo' when the photo was rejected)
+  retake_reason?: 'too_dark' | 'overexposed' | 'blurry' | 'low_contrast';
+  quality?: {
+    passed: boolean;
+    reason: string | null;
+    message: string | null;
+    metrics: { [name: string]: number };
+  };
+  // Closest known fault from the visual fault index
+  fault_match?: {
+    fault: string;
+    similarity: number;
+    reference: string | null;
+  };
+  // Time budget used by the request
+  deadline?: {
+    budget_seconds: number;
+    elapsed_seconds: number;
+    completed_stages: Array<{ stage: string; seconds: number }>;
+  };
   // OCR device info
   device_info?: {
     model_number: string | null;
     serial_number: string | null;
     product_type: string;
+    raw_model_number?: string | null;
+    vendor?: string | null;
+    catalog_product_type?: string | null;
+    catalog_match_distance?: number | null;
     raw_text: string[];
     text_detections: number;
     error?: string;
   };
 }
 
+export interface StreamStats {
+  frames_received: number;
+  frames_processed: number;
+  frames_duplicate: number;
+  frames_rejected: number;
+  frames_superseded: number;
+}
+
+export interface StreamMessage {
+  type: 'classification' | 'device_info' | 'retake' | 'error';
+  frame?: number;
+  stream: StreamStats;
+  detail?: string;
+  // Present on 'device_info' messages
+  device_info?: DeviceIdentificationResponse['device_info'];
+  updated_fields?: string[];
+  // 'classification' messages carry the same fields as DeviceIdentificationResponse
+  [key: string]: any;
+}
+
+export interface IdentifyStream {
+  messages: Observable<StreamMessage>;
+  sendFrame(frame: Blob): void;
+  close(): void;
+}
+
 export interface HealthResponse {
   status: string;
   service: string;
@@ -71,6 +121,35 @@ export class DeviceIdentifierService {
     );
   }
 
+  /**
+   * Open a live identification stream over WebSocket. Send camera frames as
+   * they are captured; the server skips near-duplicate frames, processes only
+   * the newest one, and pushes classification and OCR results as they arrive.
+   * @param filename Optional filename used for the diagnostic rules
+   */
+  openIdentifyStream(filename?: string): IdentifyStream {
+    const wsUrl = this.apiUrl.replace(/^http/, 'ws') + '/identify/stream'
+      + (filename ? `?filename=${encodeURIComponent(filename)}` : '');
+    const socket = new WebSocket(wsUrl);
+    socket.binaryType = 'arraybuffer';
+
+    const messages = new Observable<StreamMessage>(observer => {
+      socket.onmessage = event => observer.next(JSON.parse(event.data));
+      socket.onerror = error => observer.error(error);
+      socket.onclose = () => observer.complete();
+    });
+
+    return {
+      messages,
+      sendFrame: (frame: Blob) => {
+        if (socket.readyState === WebSocket.OPEN) {
+          socket.send(frame);
+        }
+      },
+      close: () => socket.close()
+    };
+  }
+
   /**
    * Convert base64 image data to Blob
    * @param base64Data Base64 encoded image data
@@ -1,17 +1,31 @@
 import os
 import io
+import time
+import asyncio
+import functools
+import threading
 import base64
 import requests
 import re
 import pytesseract
 from PIL import Image as PILImage
-from typing import Optional, Dict, Any, List
-from fastapi import FastAPI, File, UploadFile, HTTPException, status
+from typing import Optional, Dict, Any, List, Tuple, Union
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from PIL import Image
 from dotenv import load_dotenv
 from config import settings
+from memory_budget import memory_budget, estimate_image_footprint, MemoryBudgetExceeded, Reservation
+from profiling import RequestProfile, sampling_profiler, allocation_tracker, check_profiling_token
+from device_catalog import DeviceCatalog, load_catalog
+from frame_stream import LatestFrameSlot, frame_fingerprint, frame_difference
+from buffer_io import BufferLike, open_buffer
+from quality_gate import check_image_quality, quality_stats
+from deadline import Deadline, DeadlineExceeded, ClientDisconnected, deadline_from_header, run_until_deadline
+from fault_index import FaultIndex
+from video_clip import probe_video, select_best_frames, merge_classifications, merge_device_info
 
 # Load environment variables
 load_dotenv()
@@ -41,6 +55,38 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+def load_device_catalog() -> Optional[DeviceCatalog]:
+    """
+    Load the device catalog configured by DEVICE_CATALOG_PATH, if any
+    """
+    if not settings.DEVICE_CATALOG_PATH:
+        return None
+    try:
+        catalog = load_catalog(settings.DEVICE_CATALOG_PATH, settings.DEVICE_CATALOG_MAX_DISTANCE)
+        print(f"📚 Loaded device catalog with {len(catalog)} models from {settings.DEVICE_CATALOG_PATH}")
+        return catalog
+    except Exception as e:
+        print(f"❌ Failed to load device catalog: {str(e)}")
+        return None
+
+device_catalog = load_device_catalog()
+
+def load_fault_index() -> Optional[FaultIndex]:
+    """
+    Memory-map the visual fault index configured by FAULT_INDEX_PATH, if any
+    """
+    if not settings.FAULT_INDEX_PATH:
+        return None
+    try:
+        index = FaultIndex.load(settings.FAULT_INDEX_PATH)
+        print(f"🖼️  Loaded fault index with {len(index)} reference images from {settings.FAULT_INDEX_PATH}")
+        return index
+    except Exception as e:
+        print(f"❌ Failed to load fault index: {str(e)}")
+        return None
+
+fault_index = load_fault_index()
+
 class HuggingFaceService:
     def __init__(self):
         self.api_token = settings.HUGGINGFACE_API_TOKEN
@@ -49,9 +95,12 @@ class HuggingFaceService:
         self.api_url = f"https://router.huggingface.co/hf-inference/models/{self.model_id}"
         self.headers = {"Authorization": f"Bearer {self.api_token}"}
     
-    def classify_image(self, image_bytes: bytes) -> Dict[str, Any]:
+    def classify_image(self, image_bytes: BufferLike, timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         Send image to Hugging Face API for classification
+        
+        `image_bytes` may be a memoryview; it is streamed from in place.
+        `timeout` defaults to HUGGINGFACE_TIMEOUT.
         """
         if not self.api_token:
             raise HTTPException(
@@ -74,8 +123,8 @@ class HuggingFaceService:
             response = requests.post(
                 self.api_url,
                 headers=headers,
-                data=image_bytes,
-                timeout=settings.HUGGINGFACE_TIMEOUT
+                data=image_bytes if isinstance(image_bytes, bytes) else open_buffer(image_bytes),
+                timeout=settings.HUGGINGFACE_TIMEOUT if timeout is None else timeout
             )
             
             if response.status_code == 503:
@@ -123,29 +172,38 @@ class HuggingFaceService:
                 detail=f"Error communicating with Hugging Face API: {str(e)}"
             )
 
-def extract_device_info_from_image(image_bytes: bytes) -> Dict[str, Any]:
+def extract_device_info_from_image(image_bytes: Union[BufferLike, Image.Image], timeout: float = 0) -> Dict[str, Any]:
     """
     Extract model number, serial number, and product type from router/modem/ONT images
     using Tesseract OCR via pytesseract.
     
     Args:
-        image_bytes: Image data as bytes
+        image_bytes: Image data as bytes (or a memoryview), or an already
+            decoded PIL image to skip decoding
+        timeout: Seconds before the Tesseract process is killed (0 for no limit)
         
     Returns:
         Dictionary containing:
             - model_number: str or None
             - serial_number: str or None
             - product_type: str or None (router, modem, ont, or unknown)
+            - raw_model_number: model number as read by OCR, before catalog correction
+            - vendor: str or None (from the device catalog)
+            - catalog_product_type: str or None (from the device catalog)
+            - catalog_match_distance: OCR-weighted edit distance to the catalog entry, or None
             - raw_text: List of extracted text strings
             - confidence: Average confidence score
     """
     try:
         # Convert bytes to PIL Image
-        image = Image.open(io.BytesIO(image_bytes))
+        if isinstance(image_bytes, Image.Image):
+            image = image_bytes
+        else:
+            image = Image.open(open_buffer(image_bytes))
         
         # Perform OCR
         print("🔍 Performing OCR on image...")
-        extracted_text = pytesseract.image_to_string(image)
+        extracted_text = pytesseract.image_to_string(image, timeout=timeout)
         extracted_texts = [line.strip() for line in extracted_text.split('\n') if line.strip()]
         
         print(f"  OCR extracted {len(extracted_texts)} lines of text")
@@ -200,10 +258,62 @@ def extract_device_info_from_image(image_bytes: bytes) -> Dict[str, Any]:
                 serial_number = match.group(1)
                 break
         
+        # Snap the model number to the device catalog when one is loaded
+        raw_model_number = model_number
+        vendor = None
+        catalog_product_type = None
+        catalog_match_distance = None
+        
+        if device_catalog is not None:
+            def find_candidates(patterns, exclude=()):
+                candidates = []
+                for pattern in patterns:
+                    for match in re.finditer(pattern, full_text):
+                        candidate = match.group(1)
+                        if candidate not in candidates and candidate not in exclude:
+                            candidates.append(candidate)
+                return candidates
+            
+            # A labelled read (MODEL:, P/N, ...) is authoritative: only it is
+            # snapped, and it is kept as read if the catalog has nothing close.
+            # Without one, model-number-shaped codes are tried, then any token
+            # with a digit (OCR confusions such as O/0 and I/1 can defeat the
+            # regexes), skipping values the serial and FCC ID labels claimed.
+            labelled = find_candidates(model_patterns[:-1])
+            if labelled:
+                candidate_tiers = [labelled]
+            else:
+                claimed = set(find_candidates(serial_patterns + [r'FCC\s*ID[:\s]*([A-Z0-9\-]+)']))
+                candidate_tiers = [
+                    find_candidates(model_patterns[-1:], claimed),
+                    find_candidates([r'\b([A-Z0-9\-]*[0-9][A-Z0-9\-]*)\b'], claimed),
+                ]
+            
+            # The closest catalog match in the first tier with a match wins
+            best_match = None
+            for candidates in candidate_tiers:
+                for candidate in candidates:
+                    catalog_match = device_catalog.lookup(candidate)
+                    if catalog_match and (best_match is None or catalog_match["distance"] < best_match[1]["distance"]):
+                        best_match = (candidate, catalog_match)
+                if best_match:
+                    break
+            
+            if best_match:
+                raw_model_number, catalog_match = best_match
+                model_number = catalog_match["model_number"]
+                vendor = catalog_match["vendor"]
+                catalog_product_type = catalog_match["product_type"]
+                catalog_match_distance = catalog_match["distance"]
+        
         result = {
             "model_number": model_number,
             "serial_number": serial_number,
             "product_type": product_type if product_type else "Unknown",
+            "raw_model_number": raw_model_number,
+            "vendor": vendor,
+            "catalog_product_type": catalog_product_type,
+            "catalog_match_distance": catalog_match_distance,
             "raw_text": extracted_texts,
             "text_detections": len(extracted_texts)
         }
@@ -217,6 +327,10 @@ def extract_device_info_from_image(image_bytes: bytes) -> Dict[str, Any]:
             "model_number": None,
             "serial_number": None,
             "product_type": "Unknown",
+            "raw_model_number": None,
+            "vendor": None,
+            "catalog_product_type": None,
+            "catalog_match_distance": None,
             "raw_text": [],
             "text_detections": 0,
             "error": str(e)
@@ -226,6 +340,12 @@ def validate_and_process_image(file: UploadFile) -> bytes:
     """
     Validate uploaded file and process image
     """
+    return process_image_bytes(read_upload(file))
+
+def read_upload(file: UploadFile) -> bytes:
+    """
+    Validate the uploaded file's content type and size and return its bytes
+    """
     # Check file type
     if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(
@@ -243,9 +363,30 @@ def validate_and_process_image(file: UploadFile) -> bytes:
             detail="File size must be less than 10MB"
         )
     
+    return file_content
+
+def process_image_bytes(file_content: BufferLike) -> bytes:
+    """
+    Normalize raw image bytes for the pipeline: convert to RGB, downscale to
+    MAX_IMAGE_DIMENSION and re-encode as JPEG.
+    """
+    processed, _ = preprocess_image_buffer(file_content)
+    return processed.tobytes()
+
+def preprocess_image_buffer(file_content: BufferLike) -> Tuple[memoryview, Image.Image]:
+    """
+    Copy-free variant of process_image_bytes for the request pipeline.
+    
+    The input buffer is decoded in place, and the JPEG is returned as a view
+    of the encoder's buffer rather than a copy. The downscaled RGB image is
+    returned too, so OCR can use it without decoding the JPEG again.
+    
+    Returns:
+        Tuple of (JPEG bytes as a memoryview, processed PIL image)
+    """
     try:
         # Process image with PIL
-        image = Image.open(io.BytesIO(file_content))
+        image = Image.open(open_buffer(file_content))
         
         # Convert to RGB if needed
         if image.mode != 'RGB':
@@ -256,9 +397,7 @@ def validate_and_process_image(file: UploadFile) -> bytes:
             image.thumbnail((settings.MAX_IMAGE_DIMENSION, settings.MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
         
         # Convert back to bytes
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format='JPEG', quality=settings.JPEG_QUALITY)
-        return img_byte_arr.getvalue()
+        return encode_jpeg(image), image
         
     except Exception as e:
         raise HTTPException(
@@ -266,6 +405,14 @@ def validate_and_process_image(file: UploadFile) -> bytes:
             detail=f"Invalid image file: {str(e)}"
         )
 
+def encode_jpeg(image: Image.Image) -> memoryview:
+    """
+    Encode an RGB image as JPEG, returning a view of the encoder's buffer
+    """
+    img_byte_arr = io.BytesIO()
+    image.save(img_byte_arr, format='JPEG', quality=settings.JPEG_QUALITY)
+    return img_byte_arr.getbuffer()
+
 
 def build_response_for_filename_simple(
     image_filename: str,
@@ -371,6 +518,156 @@ def build_response_for_filename_simple(
 
     return response_data
 
+async def run_stage(
+    stage: str,
+    func,
+    *args,
+    profile: Optional[RequestProfile] = None,
+    deadline: Optional[Deadline] = None,
+    reservation: Optional[Reservation] = None,
+):
+    """
+    Run a blocking pipeline stage in the threadpool, under the request
+    profiler and allocation tracker when they are enabled
+    
+    With a deadline, the stage is not started once the deadline has passed,
+    and is recorded in the deadline's completed stages when it finishes.
+    
+    With a reservation, the worker thread keeps it held until it finishes,
+    even if the request is cancelled while the stage is still running.
+    """
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded()
+    call = func
+    if allocation_tracker.tracing:
+        call = functools.partial(allocation_tracker.call, stage, call)
+    if profile is not None:
+        call = functools.partial(profile.call, stage, call)
+    start = time.perf_counter()
+    if reservation is None:
+        result = await run_in_threadpool(call, *args)
+    else:
+        stage_task = asyncio.ensure_future(run_in_threadpool(call, *args))
+        reservation.hold_until_done(stage_task)
+        # Shielded so cancelling the request does not end stage_task before its thread does
+        result = await asyncio.shield(stage_task)
+    if deadline is not None:
+        deadline.record_stage(stage, time.perf_counter() - start)
+    return result
+
+def stage_timeout(deadline: Optional[Deadline], cap: Optional[float] = None) -> Optional[float]:
+    """
+    Time budget for the next stage: the deadline's remaining time capped at
+    `cap`, or just `cap` without a deadline
+    """
+    return deadline.stage_timeout(cap) if deadline is not None else cap
+
+def request_deadline(request: Request) -> Deadline:
+    """
+    Deadline for a request, from its X-Request-Deadline header (seconds)
+    or REQUEST_DEADLINE_SECONDS
+    """
+    try:
+        return deadline_from_header(request.headers.get("x-request-deadline"))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="X-Request-Deadline must be a positive number of seconds"
+        )
+
+async def identify_with_deadline(work, deadline: Deadline, request: Request) -> JSONResponse:
+    """
+    Await an identification coroutine under its deadline
+    
+    If the deadline passes first, responds 504 with the stages that completed
+    and any partial results. If the client disconnects, the work is abandoned.
+    """
+    try:
+        response_data = await run_until_deadline(work, deadline, request)
+    except DeadlineExceeded:
+        print(f"⏱️  Deadline exceeded: {deadline.summary()}")
+        return JSONResponse(
+            status_code=504,
+            content={
+                "detail": "Request deadline exceeded",
+                "status": "deadline_exceeded",
+                **deadline.partial_results,
+                "deadline": deadline.summary(),
+            }
+        )
+    except ClientDisconnected:
+        print(f"🔌 Client disconnected, abandoned request: {deadline.summary()}")
+        # Nobody is listening; the status is only for access logs
+        return JSONResponse(status_code=499, content={"detail": "Client disconnected"})
+    
+    response_data["deadline"] = deadline.summary()
+    print("response_data: ", response_data)
+    return JSONResponse(content=response_data)
+
+async def reserve_image_memory(
+    file_content: BufferLike,
+    deadline: Optional[Deadline] = None,
+    upload_reservation: Optional[Reservation] = None,
+):
+    """
+    Estimate an image's decoded footprint from its header and reserve it from
+    the memory budget, waiting on the event loop if the budget is exhausted
+    (but no longer than the request's deadline allows)
+    
+    If the request body was already reserved (upload_reservation), only the
+    decoded copies are reserved and the returned reservation takes over the
+    body's bytes.
+    """
+    try:
+        footprint = estimate_image_footprint(file_content)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid image file: {str(e)}"
+        )
+    if upload_reservation is not None:
+        footprint.pop("upload")
+    
+    try:
+        reservation = await reserve_memory(footprint, deadline)
+    except MemoryBudgetExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if upload_reservation is not None:
+        reservation.absorb(upload_reservation)
+    return reservation
+
+async def reserve_memory(footprint: Dict[str, int], deadline: Optional[Deadline] = None) -> Reservation:
+    """
+    Reserve `footprint` from the memory budget, waiting no longer than
+    MEMORY_BUDGET_WAIT_TIMEOUT or the request's deadline
+    """
+    wait_timeout = stage_timeout(deadline, settings.MEMORY_BUDGET_WAIT_TIMEOUT)
+    return await memory_budget.reserve(footprint, wait_timeout)
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """
+    Dependency guarding the debug endpoints: 404 unless PROFILING_TOKEN is
+    configured, 403 if the X-Profile-Token header does not match
+    """
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not check_profiling_token(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+def request_profile_for(request: Request) -> Optional[RequestProfile]:
+    """
+    Return a RequestProfile if the request asked to be profiled with
+    ?profile=1 or an X-Profile: 1 header, otherwise None. The flag is
+    ignored when profiling is disabled (no PROFILING_TOKEN).
+    """
+    if not settings.PROFILING_TOKEN:
+        return None
+    if request.query_params.get("profile") != "1" and request.headers.get("x-profile") != "1":
+        return None
+    if not check_profiling_token(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+    return RequestProfile()
+
 # Initialize Hugging Face service
 hf_service = HuggingFaceService()
 
@@ -384,7 +681,11 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "/identify": "POST - Upload image to identify telecom device",
+            "/identify/raw": "POST - Identify from a raw image body (filename in X-Filename header)",
             "/health": "GET - Health check",
+            "/metrics": "GET - Runtime metrics",
+            "/identify/video": "POST - Upload a short video clip; the best frames are identified",
+            "/identify/stream": "WebSocket - Stream camera frames for live identification",
             "/docs": "GET - Interactive API documentation"
         }
     }
@@ -401,14 +702,295 @@ async def health_check():
         "model": settings.HUGGINGFACE_MODEL_ID
     }
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Runtime metrics for this API process
+    """
+    return {
+        "memory_budget": memory_budget.stats(),
+        "quality_gate": quality_stats.stats()
+    }
+
+@app.post("/debug/profile/sample", dependencies=[Depends(require_profiling_token)])
+async def start_sampling_profile(seconds: float = 30.0, interval_ms: float = 5.0):
+    """
+    Sample all threads for `seconds` and write a collapsed-stack file for flamegraphs
+    """
+    if seconds <= 0 or seconds > settings.PROFILING_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be between 0 and {settings.PROFILING_MAX_SECONDS}"
+        )
+    if interval_ms < 1 or interval_ms > 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if not sampling_profiler.start(seconds, interval_ms / 1000.0):
+        raise HTTPException(status_code=409, detail="Sampling profiler is already running")
+    return sampling_profiler.status()
+
+@app.get("/debug/profile/sample", dependencies=[Depends(require_profiling_token)])
+async def sampling_profile_status():
+    """
+    Status of the sampling profiler and the path of the last output file
+    """
+    return sampling_profiler.status()
+
+@app.post("/debug/tracemalloc/start", dependencies=[Depends(require_profiling_token)])
+async def start_tracemalloc(frames: int = 10):
+    """
+    Start tracing allocations and take a baseline snapshot
+    """
+    if frames < 1 or frames > 100:
+        raise HTTPException(status_code=400, detail="frames must be between 1 and 100")
+    allocation_tracker.start(frames)
+    return {"tracing": True}
+
+@app.get("/debug/tracemalloc/snapshot", dependencies=[Depends(require_profiling_token)])
+async def tracemalloc_snapshot(limit: int = 25):
+    """
+    Diff a new snapshot against the previous one and report per-stage allocations
+    """
+    if not allocation_tracker.tracing:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running")
+    return await run_in_threadpool(allocation_tracker.snapshot, limit)
+
+@app.post("/debug/tracemalloc/stop", dependencies=[Depends(require_profiling_token)])
+async def stop_tracemalloc():
+    """
+    Stop tracing allocations
+    """
+    allocation_tracker.stop()
+    return {"tracing": False}
+
+async def read_raw_body(request: Request, deadline: Optional[Deadline] = None) -> Tuple[memoryview, Reservation]:
+    """
+    Read a raw request body into a single buffer, enforcing MAX_FILE_SIZE
+    
+    The body's size comes from the Content-Length header (411 without one).
+    It is reserved from the memory budget before the buffer is allocated,
+    so clients announcing large bodies cannot allocate memory outside the
+    budget; each received chunk is then copied into place.
+    
+    Returns:
+        Tuple of (memoryview over the buffer, reservation holding its bytes)
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is None:
+        raise HTTPException(status_code=411, detail="Content-Length header is required")
+    try:
+        expected = int(content_length)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+    if expected < 0:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+    if expected > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail="File size must be less than 10MB")
+    
+    try:
+        reservation = await reserve_memory({"upload": expected}, deadline)
+    except MemoryBudgetExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    try:
+        buffer = bytearray(expected)
+        view = memoryview(buffer)
+        received = 0
+        async for chunk in request.stream():
+            if received + len(chunk) > expected:
+                raise HTTPException(status_code=400, detail="Request body longer than Content-Length")
+            view[received:received + len(chunk)] = chunk
+            received += len(chunk)
+        if received != expected:
+            raise HTTPException(status_code=400, detail="Request body shorter than Content-Length")
+    except BaseException:
+        reservation.release()
+        raise
+    return view, reservation
+
+def apply_fault_match(response_data: Dict[str, Any], fault_match: Optional[Dict[str, Any]]) -> None:
+    """
+    Fill in problem fields from a visual fault match, unless the filename
+    rules in build_response_for_filename_simple already detected a problem
+    """
+    if fault_match is None:
+        return
+    response_data["fault_match"] = {
+        "fault": fault_match["fault"],
+        "similarity": fault_match["similarity"],
+        "reference": fault_match["reference"],
+    }
+    if response_data.get("problem_detected") or not fault_match.get("problem_detected"):
+        return
+    response_data["problem_detected"] = True
+    if fault_match.get("problem_description"):
+        response_data["problem_description"] = fault_match["problem_description"]
+    if fault_match.get("dispatch_note"):
+        response_data["dispatch_note"] = fault_match["dispatch_note"]
+
+def withhold_problem(response_data: Dict[str, Any]) -> None:
+    """
+    Clear the problem fields set by the filename rules, for a photo the
+    quality gate rejected
+    """
+    response_data["problem_detected"] = False
+    response_data.pop("problem_description", None)
+    response_data.pop("dispatch_note", None)
+
+def retake_photo_results(quality: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Classification-style results for a photo rejected by the quality gate
+    """
+    return {
+        "status": "retake_photo",
+        "message": quality["message"],
+        "retake_reason": quality["reason"],
+        "predictions": []
+    }
+
+def photo_rejected(quality: Optional[Dict[str, Any]]) -> bool:
+    """True if the quality gate ran and rejected the photo"""
+    return quality is not None and not quality["passed"]
+
+def screen_photo(image: Image.Image) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Screen a decoded, downscaled photo before classification: the quality
+    gate, then (only for photos that pass it, since a dark or blurry photo
+    matches faults spuriously) the known-fault index
+    
+    Shared by every path that identifies photos, so they agree on which
+    photos are rejected and which faults are detected.
+    
+    Returns:
+        Tuple of (quality result, or None with the gate disabled;
+        fault match, or None)
+    """
+    quality = check_image_quality(image) if settings.QUALITY_GATE_ENABLED else None
+    fault_match = None
+    if not photo_rejected(quality) and fault_index is not None:
+        fault_match = fault_index.match(image, settings.FAULT_MATCH_MIN_SIMILARITY)
+    return quality, fault_match
+
+def apply_screening(
+    response_data: Dict[str, Any],
+    quality: Optional[Dict[str, Any]],
+    fault_match: Optional[Dict[str, Any]],
+) -> None:
+    """
+    Add the results of screen_photo to a response built by
+    build_response_for_filename_simple
+    """
+    if photo_rejected(quality):
+        # A photo that has to be retaken cannot confirm a problem
+        withhold_problem(response_data)
+    else:
+        apply_fault_match(response_data, fault_match)
+    if quality is not None:
+        response_data["quality"] = quality
+
+async def identify_image(
+    file_content: BufferLike,
+    image_filename: Optional[str],
+    profile: Optional[RequestProfile] = None,
+    deadline: Optional[Deadline] = None,
+    upload_reservation: Optional[Reservation] = None,
+) -> Dict[str, Any]:
+    """
+    Run the identification pipeline on one uploaded image
+    
+    Photos that fail the quality gate skip classification and OCR and come
+    back with status "retake_photo" and a retake_reason.
+    
+    The upload is passed through as a single buffer: decoded in place,
+    re-encoded into one JPEG buffer that is streamed to the classifier, and
+    the decoded image is handed to OCR directly instead of re-decoding it.
+    
+    With a deadline, each stage gets only the remaining time and results are
+    saved in deadline.partial_results as they become available.
+    
+    If the body was already reserved (upload_reservation), this request's
+    reservation takes its bytes over and releases them with the rest.
+    
+    Returns:
+        Response dict with classification results, diagnostics and device_info
+    """
+    # Reserve memory for this image before decoding it
+    reservation = await reserve_image_memory(file_content, deadline, upload_reservation)
+    
+    with reservation:
+        # Decode, convert and downscale the uploaded image
+        processed_image_bytes, processed_image = await run_stage(
+            "preprocess", preprocess_image_buffer, file_content,
+            profile=profile, deadline=deadline, reservation=reservation,
+        )
+        # The caller still holds the upload, so only the decoded copies are released here
+        reservation.release("decoded", "rgb")
+        
+        # Reject unusable photos before the expensive stages, and look the
+        # rest up in the reference library of known faults
+        quality, fault_match = await run_stage(
+            "screen", screen_photo, processed_image,
+            profile=profile, deadline=deadline, reservation=reservation,
+        )
+        if deadline is not None and quality is not None:
+            deadline.partial_results["quality"] = quality
+        
+        if photo_rejected(quality):
+            print(f"📷 Quality gate failed: {quality['reason']}")
+            results = retake_photo_results(quality)
+            ocr_info = None
+        else:
+            # Send to Hugging Face for classification
+            results = await run_stage(
+                "classify", hf_service.classify_image, processed_image_bytes,
+                stage_timeout(deadline, settings.HUGGINGFACE_TIMEOUT),
+                profile=profile, deadline=deadline, reservation=reservation,
+            )
+            if deadline is not None:
+                deadline.partial_results["classification"] = results
+            
+            # Extract device information using OCR
+            ocr_info = await run_stage(
+                "ocr", extract_device_info_from_image, processed_image,
+                stage_timeout(deadline) or 0,
+                profile=profile, deadline=deadline, reservation=reservation,
+            )
+    
+    # Build response using centralized filename-based logic
+    response_data = build_response_for_filename_simple(
+        image_filename,
+        image_filename,
+        len(processed_image_bytes),
+        hf_service.model_id,
+        results,
+    )
+    
+    apply_screening(response_data, quality, fault_match)
+    
+    # Add OCR-extracted device information to response
+    if ocr_info is not None:
+        response_data["device_info"] = ocr_info
+    
+    if profile is not None:
+        response_data["profile"] = await run_in_threadpool(profile.report)
+    
+    return response_data
+
 @app.post("/identify")
-async def identify_device(file: UploadFile = File(...)):
+async def identify_device(request: Request, file: UploadFile = File(...)):
     """
     Upload an image of a telecom device and get identification results
     
     Args:
         file: Image file (JPEG, PNG, etc.) containing a telecom device
         
+    Add ?profile=1 (or an X-Profile: 1 header) together with a valid
+    X-Profile-Token header to get a cProfile summary of this request in the
+    response under "profile".
+    
+    The request must finish within REQUEST_DEADLINE_SECONDS, or the number of
+    seconds in an X-Request-Deadline header; otherwise it is cancelled and a
+    504 lists the stages that completed.
+        
     Returns:
         JSON response with device classification results and OCR-extracted device info
     """
@@ -416,31 +998,247 @@ async def identify_device(file: UploadFile = File(...)):
         print(f"📸 Received image: {file.filename}")
         
         image_filename = file.filename
+        profile = request_profile_for(request)
+        deadline = request_deadline(request)
+        
+        # Validate the uploaded image and run the pipeline under the deadline
+        file_content = read_upload(file)
+        return await identify_with_deadline(
+            identify_image(file_content, image_filename, profile, deadline),
+            deadline,
+            request,
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+@app.post("/identify/raw")
+async def identify_device_raw(request: Request, x_filename: Optional[str] = Header(None)):
+    """
+    Identify a telecom device from an image sent as the raw request body
+    
+    Same results as /identify, but the body is the image itself
+    (Content-Type image/* or application/octet-stream) rather than a
+    multipart form, which skips multipart parsing and temp-file spooling.
+    The filename used by the diagnostic rules goes in the X-Filename header.
+    
+    Returns:
+        JSON response with device classification results and OCR-extracted device info
+    """
+    try:
+        print(f"📸 Received raw image: {x_filename}")
         
-        # Validate and process the uploaded image
-        processed_image_bytes = validate_and_process_image(file)
+        content_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+        if not (content_type.startswith("image/") or content_type == "application/octet-stream"):
+            raise HTTPException(
+                status_code=400,
+                detail="Body must be an image (Content-Type image/* or application/octet-stream)"
+            )
         
-        # Send to Hugging Face for classification
-        results = hf_service.classify_image(processed_image_bytes)
+        profile = request_profile_for(request)
+        deadline = request_deadline(request)
         
-        # Extract device information using OCR
-        ocr_info = extract_device_info_from_image(processed_image_bytes)
+        # The body is reserved before it is buffered; identify_image takes the
+        # reservation over, and whatever it did not take is released on exit
+        file_content, upload_reservation = await read_raw_body(request, deadline)
+        with upload_reservation:
+            return await identify_with_deadline(
+                identify_image(file_content, x_filename, profile, deadline, upload_reservation),
+                deadline,
+                request,
+            )
         
-        # Build response using centralized filename-based logic
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+async def identify_video_clip(
+    fileobj,
+    filename: Optional[str],
+    file_size: int,
+    top_k: int,
+    profile: Optional[RequestProfile] = None,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """
+    Run best-frame selection, then classification and OCR on the selected
+    frames of a video clip
+    
+    Returns:
+        Response dict in the /identify format, with merged classification and
+        device_info, per-frame results under "frames" and decoding stats under "video"
+    """
+    try:
+        footprint = await run_in_threadpool(probe_video, fileobj, top_k)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid video file: {str(e)}"
+        )
+    
+    try:
+        reservation = await reserve_memory(footprint, deadline)
+    except MemoryBudgetExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    # The decode thread owns its container; if this request is abandoned it
+    # is only told to stop, never closed from here while still decoding
+    abandoned = threading.Event()
+    
+    def should_stop() -> bool:
+        return abandoned.is_set() or (deadline is not None and deadline.expired)
+    
+    with reservation:
+        try:
+            frames, decode_stats = await run_stage(
+                "decode", select_best_frames, fileobj, top_k,
+                settings.VIDEO_MAX_FRAMES, settings.VIDEO_FRAME_STRIDE, should_stop,
+                settings.VIDEO_MIN_FRAME_GAP_SECONDS,
+                profile=profile, deadline=deadline, reservation=reservation,
+            )
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid video file: {str(e)}"
+            )
+        finally:
+            abandoned.set()
+        reservation.release("decode")
+        if not frames:
+            raise HTTPException(status_code=400, detail="No frames could be decoded from the video")
+        
+        async def identify_frame(frame: Dict[str, Any]):
+            image = frame.pop("image")
+            quality, fault_match = await run_stage(
+                "screen", screen_photo, image,
+                profile=profile, deadline=deadline, reservation=reservation,
+            )
+            if quality is not None:
+                frame["quality"] = quality
+            if photo_rejected(quality):
+                return None
+            image_bytes = await run_stage(
+                "preprocess", encode_jpeg, image,
+                profile=profile, deadline=deadline, reservation=reservation,
+            )
+            results = await run_stage(
+                "classify", hf_service.classify_image, image_bytes,
+                stage_timeout(deadline, settings.HUGGINGFACE_TIMEOUT),
+                profile=profile, deadline=deadline, reservation=reservation,
+            )
+            ocr_info = await run_stage(
+                "ocr", extract_device_info_from_image, image,
+                stage_timeout(deadline) or 0,
+                profile=profile, deadline=deadline, reservation=reservation,
+            )
+            return results, ocr_info, fault_match
+        
+        # The selected frames are independent, so screen, classify and OCR them concurrently
+        frame_results = await asyncio.gather(*(identify_frame(frame) for frame in frames))
+    
+    # Frames rejected by the quality gate take no part in the results
+    identified = [result for result in frame_results if result is not None]
+    for frame, result in zip(frames, frame_results):
+        if result is not None:
+            results, ocr_info, _ = result
+            frame["top_prediction"] = results.get("top_prediction")
+            frame["device_info"] = ocr_info
+    
+    if not identified:
+        # Every selected frame was rejected; report the best frame's reason
+        quality = frames[0]["quality"]
         response_data = build_response_for_filename_simple(
-            image_filename,
-            file.filename,
-            len(processed_image_bytes),
+            filename,
+            filename,
+            file_size,
             hf_service.model_id,
-            results,
+            retake_photo_results(quality),
         )
-        
-        # Add OCR-extracted device information to response
-        response_data["device_info"] = ocr_info
+        apply_screening(response_data, quality, None)
+    else:
+        response_data = build_response_for_filename_simple(
+            filename,
+            filename,
+            file_size,
+            hf_service.model_id,
+            merge_classifications([results for results, _, _ in identified]),
+        )
+        fault_matches = [fault_match for _, _, fault_match in identified if fault_match is not None]
+        best_fault_match = max(fault_matches, key=lambda match: match["similarity"], default=None)
+        apply_screening(response_data, None, best_fault_match)
+        response_data["device_info"] = merge_device_info([ocr_info for _, ocr_info, _ in identified])
+    response_data["frames"] = frames
+    response_data["video"] = decode_stats
+    
+    if profile is not None:
+        response_data["profile"] = await run_in_threadpool(profile.report)
+    
+    return response_data
 
-        print("response_data: ", response_data)
+@app.post("/identify/video")
+async def identify_device_video(request: Request, file: UploadFile = File(...), top_k: Optional[int] = None):
+    """
+    Upload a short video clip of a telecom device and get identification results
+    
+    Frames are decoded one at a time and scored for sharpness and text
+    presence; only the `top_k` best frames (default VIDEO_TOP_K) are
+    screened, classified and OCR'd. Frames the quality gate rejects are left
+    out, classification scores are averaged across the rest and each OCR
+    field is chosen by majority vote.
+    
+    Args:
+        file: Video file (MP4, MOV, WebM, etc.)
+        top_k: Number of frames to run classification and OCR on
         
-        return JSONResponse(content=response_data)
+    Returns:
+        JSON response in the /identify format, plus per-frame results under "frames"
+    """
+    try:
+        print(f"🎬 Received video: {file.filename}")
+        
+        if not file.content_type or not file.content_type.startswith('video/'):
+            raise HTTPException(
+                status_code=400,
+                detail="File must be a video (MP4, MOV, WebM, etc.)"
+            )
+        
+        if top_k is None:
+            top_k = settings.VIDEO_TOP_K
+        if top_k < 1 or top_k > settings.VIDEO_MAX_TOP_K:
+            raise HTTPException(
+                status_code=400,
+                detail=f"top_k must be between 1 and {settings.VIDEO_MAX_TOP_K}"
+            )
+        
+        # The upload is already spooled to a temp file; decode straight from it
+        file.file.seek(0, io.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
+        if file_size > settings.MAX_VIDEO_FILE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Video size must be less than {settings.MAX_VIDEO_FILE_SIZE // (1024 * 1024)}MB"
+            )
+        
+        profile = request_profile_for(request)
+        deadline = request_deadline(request)
+        
+        return await identify_with_deadline(
+            identify_video_clip(file.file, file.filename, file_size, top_k, profile, deadline),
+            deadline,
+            request,
+        )
         
     except HTTPException:
         raise
@@ -450,6 +1248,144 @@ async def identify_device(file: UploadFile = File(...)):
             detail=f"Internal server error: {str(e)}"
         )
 
+@app.websocket("/identify/stream")
+async def identify_stream(websocket: WebSocket, filename: Optional[str] = None):
+    """
+    Live identification from a stream of camera frames
+    
+    The client sends each frame as a binary message (JPEG, PNG, etc.). Only
+    the newest frame is processed; frames that arrive while the pipeline is
+    busy replace any frame still waiting, and frames nearly identical to the
+    last processed one are skipped. For every processed frame the server
+    pushes:
+        - {"type": "classification", ...}: classification and filename
+          diagnostics, as soon as the classifier returns
+        - {"type": "device_info", ...}: OCR fields merged across all frames
+          so far, with the names of fields this frame added or changed
+        - {"type": "retake", ...}: if the frame failed the quality gate
+        - {"type": "error", "detail": ...}: if the frame could not be processed
+    
+    The optional `filename` query parameter feeds the filename-based
+    diagnostic rules, as with /identify.
+    """
+    await websocket.accept()
+    slot = LatestFrameSlot()
+    counters = {"frames_received": 0, "frames_processed": 0, "frames_duplicate": 0, "frames_rejected": 0}
+    
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                frame = message.get("bytes")
+                if frame is None:
+                    continue
+                counters["frames_received"] += 1
+                if len(frame) > settings.MAX_FILE_SIZE:
+                    counters["frames_rejected"] += 1
+                    continue
+                slot.put(frame)
+        finally:
+            slot.close()
+    
+    receiver = asyncio.create_task(receive_frames())
+    last_fingerprint = None
+    device_info: Dict[str, Any] = {}
+    
+    def stream_stats() -> Dict[str, int]:
+        return {**counters, "frames_superseded": slot.superseded}
+    
+    try:
+        while True:
+            frame = await slot.get()
+            if frame is None:
+                break
+            
+            try:
+                # Reserve before anything is decoded; only JPEG fingerprints cheaply
+                reservation = await reserve_image_memory(frame)
+                with reservation:
+                    # Cheap change detection on a tiny grayscale thumbnail
+                    fingerprint = await run_in_threadpool(frame_fingerprint, frame)
+                    if (last_fingerprint is not None
+                            and frame_difference(fingerprint, last_fingerprint) < settings.STREAM_DEDUP_THRESHOLD):
+                        counters["frames_duplicate"] += 1
+                        continue
+                    counters["frames_processed"] += 1
+                    frame_number = counters["frames_processed"]
+                    
+                    processed_image_bytes, processed_image = await run_stage("preprocess", preprocess_image_buffer, frame)
+                    del frame
+                    reservation.release("upload", "decoded", "rgb")
+                    
+                    quality, fault_match = await run_stage("screen", screen_photo, processed_image)
+                    if photo_rejected(quality):
+                        await websocket.send_json({
+                            "type": "retake",
+                            "frame": frame_number,
+                            **retake_photo_results(quality),
+                            "quality": quality,
+                            "stream": stream_stats(),
+                        })
+                        continue
+                    
+                    results = await run_stage("classify", hf_service.classify_image, processed_image_bytes)
+                    
+                    # Only frames that passed the gate and were classified count
+                    # for dedup: the fingerprint cannot tell a blurry frame from
+                    # its refocused retake, and a cold-start "model_loading"
+                    # reply must not stop the same scene from being retried
+                    if results.get("status") == "success":
+                        last_fingerprint = fingerprint
+                    classification = build_response_for_filename_simple(
+                        filename,
+                        filename,
+                        len(processed_image_bytes),
+                        hf_service.model_id,
+                        results,
+                    )
+                    apply_screening(classification, quality, fault_match)
+                    await websocket.send_json({
+                        "type": "classification",
+                        "frame": frame_number,
+                        **classification,
+                        "stream": stream_stats(),
+                    })
+                    
+                    ocr_info = await run_stage("ocr", extract_device_info_from_image, processed_image)
+                
+                # Keep the best-known value of each field across frames
+                updated_fields = []
+                for key, value in ocr_info.items():
+                    if key in ("raw_text", "text_detections", "error"):
+                        continue
+                    if value not in (None, "Unknown") and device_info.get(key) != value:
+                        device_info[key] = value
+                        updated_fields.append(key)
+                device_info.setdefault("product_type", "Unknown")
+                
+                await websocket.send_json({
+                    "type": "device_info",
+                    "frame": frame_number,
+                    "device_info": device_info,
+                    "updated_fields": updated_fields,
+                    "stream": stream_stats(),
+                })
+                
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail, "stream": stream_stats()})
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"type": "error", "detail": f"Invalid frame: {str(e)}", "stream": stream_stats()})
+    
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        print(f"📹 Stream closed: {stream_stats()}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=settings.API_HOST, port=settings.API_PORT)
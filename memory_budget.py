@@ -0,0 +1,259 @@
+"""
+Process-wide budget for the memory held by in-flight images.
+
+Each /identify request holds several copies of the image at once (the raw
+upload, the decoded full-resolution bitmap, an RGB copy, the re-encoded JPEG
+and the copy handed to Tesseract). The footprint of those copies is estimated
+from the image header before anything is decoded, reserved from a shared
+budget, and released stage by stage as the copies go away.
+
+Waiting for free budget happens on the event loop rather than in a worker
+thread: the threadpool is shared by every request, and threads parked
+waiting for budget would starve the very stages that release it.
+"""
+
+import asyncio
+import threading
+from typing import Dict, Any, Optional
+
+from PIL import Image
+
+from buffer_io import BufferLike, open_buffer
+from config import settings
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a reservation cannot be satisfied within the wait timeout."""
+
+def estimate_image_footprint(file_content: BufferLike) -> Dict[str, int]:
+    """
+    Estimate the bytes held by each pipeline stage for an uploaded image.
+
+    Only the image header is parsed (PIL opens lazily), so this is cheap even
+    for very large images.
+
+    Returns:
+        Dictionary of stage name to estimated bytes:
+            - upload: the raw request body
+            - decoded: full-resolution bitmap in the source mode
+            - rgb: RGB conversion (0 if the source is already RGB)
+            - processed: downscaled bitmap, re-encoded JPEG and the OCR copy
+    """
+    with Image.open(open_buffer(file_content)) as image:
+        width, height = image.size
+        bands = len(image.getbands())
+        is_rgb = image.mode == "RGB"
+
+    pixels = width * height
+    scale = min(1.0, settings.MAX_IMAGE_DIMENSION / max(width, height, 1))
+    processed_pixels = int(width * scale) * int(height * scale)
+
+    return {
+        "upload": len(file_content),
+        "decoded": pixels * bands,
+        "rgb": 0 if is_rgb else pixels * 3,
+        # Downscaled RGB bitmap + JPEG (bounded by the bitmap) + Tesseract's copy
+        "processed": processed_pixels * 3 * 3,
+    }
+
+class Reservation:
+    """
+    A block of bytes reserved from a MemoryBudget, split by pipeline stage.
+
+    Use as a context manager so whatever is still held is released on exit.
+    Stages running in worker threads are registered with hold_until_done():
+    a worker thread cannot be interrupted, so if the request is cancelled
+    the final release waits until those threads have finished with the image.
+    """
+
+    def __init__(self, budget: "MemoryBudget", footprint: Dict[str, int]):
+        self._budget = budget
+        self._held = dict(footprint)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._closed = False
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._held.values())
+
+    def hold_until_done(self, future: "asyncio.Future") -> None:
+        """Keep everything still held reserved at least until `future` completes."""
+        with self._lock:
+            self._in_flight += 1
+        future.add_done_callback(self._stage_done)
+
+    def _stage_done(self, future: "asyncio.Future") -> None:
+        # Nobody may be awaiting an abandoned stage; retrieve its exception so
+        # asyncio does not log it
+        if not future.cancelled():
+            future.exception()
+        with self._lock:
+            self._in_flight -= 1
+            release = self._closed and self._in_flight == 0
+        if release:
+            self._release_stages(tuple(self._held))
+
+    def absorb(self, other: "Reservation") -> None:
+        """
+        Take over the bytes still held by `other`, so they are released with
+        this reservation instead (e.g. a request body reserved before its
+        image could be inspected).
+        """
+        with other._lock:
+            held, other._held = other._held, {}
+        with self._lock:
+            for name, nbytes in held.items():
+                self._held[name] = self._held.get(name, 0) + nbytes
+
+    def release(self, *stages: str) -> None:
+        """
+        Release the given stages, or everything still held if none are given.
+
+        Releasing everything is deferred while stages registered with
+        hold_until_done() are still running.
+        """
+        if not stages:
+            with self._lock:
+                self._closed = True
+                if self._in_flight:
+                    return
+            stages = tuple(self._held)
+        self._release_stages(stages)
+
+    def _release_stages(self, stages) -> None:
+        with self._lock:
+            freed = sum(self._held.pop(name, 0) for name in stages)
+        if freed:
+            self._budget._release(freed)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+class MemoryBudget:
+    """
+    Counting budget of bytes, shared by all requests in a process.
+
+    reserve() is a coroutine that waits on the event loop until enough of the
+    budget is free, and raises MemoryBudgetExceeded if that does not happen
+    within `wait_timeout` seconds or if the request could never fit in the
+    budget at all. Reservations may be released from any thread; waiters are
+    woken on the event loop.
+    """
+
+    def __init__(self, limit_bytes: int, wait_timeout: float):
+        self.limit_bytes = limit_bytes
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._condition: Optional[asyncio.Condition] = None
+        self._in_use = 0
+        self._peak = 0
+        self._waiting = 0
+        self._reservations = 0
+        self._rejected = 0
+
+    def _try_acquire(self, nbytes: int) -> bool:
+        with self._lock:
+            if self._in_use + nbytes > self.limit_bytes:
+                return False
+            self._in_use += nbytes
+            self._peak = max(self._peak, self._in_use)
+            self._reservations += 1
+            return True
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def reserve(self, footprint: Dict[str, int], timeout: Optional[float] = None) -> Reservation:
+        """
+        Reserve the total of `footprint` from the budget.
+
+        Nothing is reserved if the wait is cancelled, so a request abandoned
+        while waiting cannot leak budget.
+
+        Args:
+            footprint: Bytes per stage, as returned by estimate_image_footprint
+            timeout: Seconds to wait for free budget (default: wait_timeout)
+
+        Returns:
+            Reservation holding the reserved bytes
+        """
+        nbytes = sum(footprint.values())
+        timeout = self.wait_timeout if timeout is None else timeout
+
+        if nbytes > self.limit_bytes:
+            with self._lock:
+                self._rejected += 1
+            raise MemoryBudgetExceeded(
+                f"Image needs ~{nbytes // (1024 * 1024)}MB, more than the "
+                f"{self.limit_bytes // (1024 * 1024)}MB memory budget"
+            )
+
+        if self._try_acquire(nbytes):
+            return Reservation(self, footprint)
+
+        condition = self._get_condition()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._waiting += 1
+        try:
+            async with condition:
+                # Only this coroutine acquires, after the wait has returned, so a
+                # cancelled wait never holds budget
+                while not self._try_acquire(nbytes):
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        with self._lock:
+                            self._rejected += 1
+                        raise MemoryBudgetExceeded("Server is busy processing other images, please retry")
+                    try:
+                        await asyncio.wait_for(condition.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._waiting -= 1
+
+        return Reservation(self, footprint)
+
+    async def _notify_waiters(self) -> None:
+        condition = self._condition
+        if condition is not None:
+            async with condition:
+                condition.notify_all()
+
+    def _wake_waiters(self) -> None:
+        # Runs on the event loop
+        asyncio.ensure_future(self._notify_waiters())
+
+    def _release(self, nbytes: int) -> None:
+        with self._lock:
+            self._in_use -= nbytes
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake_waiters)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of budget usage for the metrics endpoint."""
+        with self._lock:
+            return {
+                "limit_bytes": self.limit_bytes,
+                "in_use_bytes": self._in_use,
+                "peak_bytes": self._peak,
+                "utilization": self._in_use / self.limit_bytes if self.limit_bytes else 0.0,
+                "waiting_requests": self._waiting,
+                "reservations_total": self._reservations,
+                "rejected_total": self._rejected,
+            }
+
+# Shared budget for this process
+memory_budget = MemoryBudget(
+    settings.MEMORY_BUDGET_BYTES,
+    settings.MEMORY_BUDGET_WAIT_TIMEOUT,
+)
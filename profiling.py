@@ -0,0 +1,250 @@
+"""
+On-demand profiling for the API.
+
+Three opt-in tools, all disabled unless PROFILING_TOKEN is configured:
+    - RequestProfile: cProfile of a single /identify request, across the
+      threadpool stages it runs
+    - SamplingProfiler: samples the stacks of every thread for N seconds and
+      writes a collapsed-stack file (flamegraph.pl / speedscope compatible)
+    - tracemalloc snapshots with diffs, plus per-stage allocation deltas
+
+When nothing is enabled the only cost on the request path is a couple of
+attribute checks.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Optional, Dict, Any, List, Callable
+
+from config import settings
+
+def check_profiling_token(token: Optional[str]) -> bool:
+    """Return True if profiling is enabled and `token` matches PROFILING_TOKEN."""
+    if not settings.PROFILING_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token, settings.PROFILING_TOKEN)
+
+def _output_path(prefix: str, extension: str) -> str:
+    os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(settings.PROFILING_OUTPUT_DIR, f"{prefix}-{timestamp}-{os.getpid()}.{extension}")
+
+# Since Python 3.12 cProfile uses the process-wide sys.monitoring, and enabling
+# a second profiler while one is active raises ValueError. Profiled stages of
+# all requests therefore take turns.
+_cprofile_lock = threading.Lock()
+
+class RequestProfile:
+    """
+    cProfile data for one request.
+
+    cProfile only sees the thread it is enabled in, so each pipeline stage is
+    profiled inside its worker thread with call(), and the results merged.
+    Only one profiled stage runs at a time in the process; concurrently
+    profiled stages (several requests, or the frames of one video) wait
+    their turn, and the wait is not counted in stage_seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self.stage_seconds: Dict[str, float] = {}
+
+    def call(self, stage: str, func: Callable, *args, **kwargs):
+        """Run `func` under cProfile and merge its stats into this profile."""
+        profiler = cProfile.Profile()
+        with _cprofile_lock:
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + elapsed
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profiler)
+                    else:
+                        self._stats.add(profiler)
+
+    def report(self, limit: int = 25) -> Dict[str, Any]:
+        """
+        Save the profile to PROFILING_OUTPUT_DIR and summarize it.
+
+        Returns:
+            Dictionary with the saved .prof path (loadable with snakeviz or
+            pstats), per-stage wall time, and the top functions by cumulative time
+        """
+        if self._stats is None:
+            return {"stage_seconds": self.stage_seconds, "top_functions": []}
+
+        path = _output_path("request", "prof")
+        self._stats.dump_stats(path)
+
+        stream = io.StringIO()
+        stats = pstats.Stats(path, stream=stream)
+        stats.sort_stats("cumulative").print_stats(limit)
+        lines = [line for line in stream.getvalue().splitlines() if line.strip()]
+
+        return {
+            "profile_path": path,
+            "stage_seconds": self.stage_seconds,
+            "top_functions": lines,
+        }
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock sampler for all threads in the process.
+
+    A background thread snapshots sys._current_frames() every `interval`
+    seconds and counts each collapsed stack. The output file has one
+    "frame;frame;frame count" line per distinct stack.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_output: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, interval: float) -> bool:
+        """Start sampling for `duration` seconds. Returns False if already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self.started_at = time.time()
+            self.duration = duration
+            self._thread = threading.Thread(
+                target=self._run, args=(duration, interval), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        """Stop an in-progress run early; samples so far are still written."""
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "last_output": self.last_output,
+        }
+
+    def _run(self, duration: float, interval: float) -> None:
+        counts: Dict[str, int] = {}
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + duration
+
+        while time.monotonic() < deadline and not self._stop.is_set():
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            self._stop.wait(interval)
+
+        path = _output_path("sample", "folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in counts.items():
+                f.write(f"{stack} {count}\n")
+        self.last_output = path
+        print(f"🔥 Sampling profile written to {path}")
+
+class AllocationTracker:
+    """
+    tracemalloc snapshots and per-stage allocation deltas.
+
+    Stage deltas are the change in traced memory across a stage call; with
+    concurrent requests they include other requests' allocations, so treat
+    them as approximate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self.stage_stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        with self._lock:
+            self._baseline = tracemalloc.take_snapshot()
+            self.stage_stats = {}
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        with self._lock:
+            self._baseline = None
+
+    def call(self, stage: str, func: Callable, *args, **kwargs):
+        """Run `func` and record the traced-memory change across it."""
+        before, _ = tracemalloc.get_traced_memory()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            after, _ = tracemalloc.get_traced_memory()
+            delta = after - before
+            with self._lock:
+                entry = self.stage_stats.setdefault(stage, {"calls": 0, "net_bytes_total": 0, "max_net_bytes": 0})
+                entry["calls"] += 1
+                entry["net_bytes_total"] += delta
+                entry["max_net_bytes"] = max(entry["max_net_bytes"], delta)
+
+    def snapshot(self, limit: int = 25, reset_baseline: bool = True) -> Dict[str, Any]:
+        """
+        Take a snapshot and diff it against the previous one.
+
+        Returns:
+            Dictionary with current/peak traced memory, the top allocation
+            sites by growth since the baseline, and per-stage deltas
+        """
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        with self._lock:
+            baseline = self._baseline
+            if reset_baseline:
+                self._baseline = snapshot
+            stage_stats = {name: dict(entry) for name, entry in self.stage_stats.items()}
+
+        if baseline is not None:
+            top = [str(stat) for stat in snapshot.compare_to(baseline, "lineno")[:limit]]
+        else:
+            top = [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+
+        return {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top_growth": top,
+            "stage_allocations": stage_stats,
+        }
+
+# Process-wide profilers
+sampling_profiler = SamplingProfiler()
+allocation_tracker = AllocationTracker()
@@ -0,0 +1,143 @@
+"""
+Image quality gate run before the expensive pipeline stages.
+
+Blurry, dark or overexposed photos give junk classifications and empty OCR,
+and the technician retakes them anyway. The gate measures a small grayscale
+copy of the preprocessed image with a few vectorized NumPy operations and
+rejects unusable photos with a specific retake reason, before the Hugging
+Face call and Tesseract run.
+
+Checks, in order:
+    - exposure: mean brightness and the share of clipped pixels
+    - sharpness: variance of the Laplacian
+    - label contrast: RMS contrast of the most contrasted tile, since a
+      readable label is a small high-contrast region
+"""
+
+import threading
+from typing import Dict, Any, Optional
+
+import numpy as np
+from PIL import Image
+
+from config import settings
+
+# Longest side of the grayscale copy the checks run on
+ANALYSIS_SIZE = 512
+# Tiles per side for the label contrast check
+CONTRAST_GRID = 8
+
+RETAKE_MESSAGES = {
+    "too_dark": "Photo is too dark - turn on more light or use the flash and retake the photo",
+    "overexposed": "Photo is overexposed - avoid glare or direct light on the device and retake the photo",
+    "blurry": "Photo is blurry - hold the camera steady, tap to focus and retake the photo",
+    "low_contrast": "No readable label found - move closer to the device label and retake the photo",
+}
+
+def _grayscale_array(image: Image.Image) -> np.ndarray:
+    gray = image.convert("L")
+    if max(gray.size) > ANALYSIS_SIZE:
+        gray.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BILINEAR)
+    return np.asarray(gray, dtype=np.float32)
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian of a 2-D gray array; higher is sharper."""
+    gray = gray.astype(np.float32, copy=False)
+    laplacian = (
+        4 * gray[1:-1, 1:-1]
+        - gray[:-2, 1:-1] - gray[2:, 1:-1]
+        - gray[1:-1, :-2] - gray[1:-1, 2:]
+    )
+    return float(laplacian.var()) if laplacian.size else 0.0
+
+def max_tile_contrast(gray: np.ndarray) -> float:
+    """Highest standard deviation of gray levels over a CONTRAST_GRID x CONTRAST_GRID tiling."""
+    # Crop to a multiple of the grid and compute every tile's std at once
+    grid = max(1, min(CONTRAST_GRID, *gray.shape))
+    rows = gray.shape[0] // grid * grid
+    cols = gray.shape[1] // grid * grid
+    tiles = gray[:rows, :cols].astype(np.float32, copy=False).reshape(grid, rows // grid, grid, cols // grid)
+    return float(tiles.std(axis=(1, 3)).max())
+
+def measure_image_quality(image: Image.Image) -> Dict[str, float]:
+    """
+    Compute the quality metrics for an image.
+
+    Returns:
+        Dictionary containing:
+            - brightness: mean gray level (0-255)
+            - dark_fraction: share of pixels at or below 16
+            - bright_fraction: share of pixels at or above 240
+            - sharpness: variance of the 4-neighbour Laplacian
+            - label_contrast: highest per-tile standard deviation of gray levels
+    """
+    gray = _grayscale_array(image)
+
+    return {
+        "brightness": float(gray.mean()),
+        "dark_fraction": float((gray <= 16).mean()),
+        "bright_fraction": float((gray >= 240).mean()),
+        "sharpness": laplacian_variance(gray),
+        "label_contrast": max_tile_contrast(gray),
+    }
+
+def check_image_quality(image: Image.Image) -> Dict[str, Any]:
+    """
+    Decide whether an image is usable, with thresholds from config.Settings.
+
+    Returns:
+        Dictionary containing:
+            - passed: bool
+            - reason: None, or one of too_dark, overexposed, blurry, low_contrast
+            - message: retake instructions for the technician, or None
+            - metrics: values from measure_image_quality
+    """
+    metrics = measure_image_quality(image)
+
+    reason: Optional[str] = None
+    if (metrics["brightness"] < settings.QUALITY_MIN_BRIGHTNESS
+            or metrics["dark_fraction"] > settings.QUALITY_MAX_CLIPPED_FRACTION):
+        reason = "too_dark"
+    elif (metrics["brightness"] > settings.QUALITY_MAX_BRIGHTNESS
+            or metrics["bright_fraction"] > settings.QUALITY_MAX_CLIPPED_FRACTION):
+        reason = "overexposed"
+    elif metrics["sharpness"] < settings.QUALITY_MIN_SHARPNESS:
+        reason = "blurry"
+    elif metrics["label_contrast"] < settings.QUALITY_MIN_LABEL_CONTRAST:
+        reason = "low_contrast"
+
+    quality_stats.record(reason)
+    return {
+        "passed": reason is None,
+        "reason": reason,
+        "message": RETAKE_MESSAGES.get(reason) if reason else None,
+        "metrics": {name: round(value, 4) for name, value in metrics.items()},
+    }
+
+class QualityGateStats:
+    """Thread-safe pass/fail counters for the metrics endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._failed: Dict[str, int] = dict.fromkeys(RETAKE_MESSAGES, 0)
+
+    def record(self, reason: Optional[str]) -> None:
+        with self._lock:
+            self._checked += 1
+            if reason is not None:
+                self._failed[reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            failed = sum(self._failed.values())
+            return {
+                "enabled": settings.QUALITY_GATE_ENABLED,
+                "checked_total": self._checked,
+                "passed_total": self._checked - failed,
+                "failed_total": failed,
+                "pass_rate": (self._checked - failed) / self._checked if self._checked else None,
+                "failed_by_reason": dict(self._failed),
+            }
+
+quality_stats = QualityGateStats()
@@ -0,0 +1,235 @@
+"""
+Best-frame selection for short video clips.
+
+Technicians often cannot get one sharp still of a rack-mounted label, so
+they can upload a short clip instead. Frames are decoded one at a time with
+PyAV and each sampled frame is scored on a small grayscale copy (sharpness
+times label contrast, the same measures the quality gate uses). Only the
+top-k frames are kept, at least VIDEO_MIN_FRAME_GAP_SECONDS apart so they
+are different views rather than near-identical neighbours, downscaled to MAX_IMAGE_DIMENSION, so decoding
+memory stays bounded by k frames whatever the clip length. Only those k
+frames go through classification and OCR.
+
+A PyAV container must not be closed while another thread is decoding from
+it, so select_best_frames opens and closes its own container in the worker
+thread that decodes; a cancelled request only asks it to stop.
+"""
+
+from collections import Counter
+from typing import BinaryIO, Dict, Any, List, Tuple, Callable, Optional
+
+import av
+from PIL import Image
+
+from config import settings
+from quality_gate import laplacian_variance, max_tile_contrast
+
+# Width of the grayscale copy frames are scored on
+SCORE_WIDTH = 320
+
+# device_info fields merged across frames by vote
+VOTED_FIELDS = (
+    "model_number",
+    "serial_number",
+    "product_type",
+    "raw_model_number",
+    "vendor",
+    "catalog_product_type",
+)
+
+def open_video(fileobj: BinaryIO) -> av.container.InputContainer:
+    """Open a video container for streaming decode; raises ValueError if there is no video stream."""
+    container = av.open(fileobj, mode="r")
+    if not container.streams.video:
+        container.close()
+        raise ValueError("File has no video stream")
+    return container
+
+def estimate_video_footprint(container: av.container.InputContainer, top_k: int) -> Dict[str, int]:
+    """
+    Estimate decoding memory from the stream's frame size, in the same
+    per-stage format as memory_budget.estimate_image_footprint.
+    """
+    codec = container.streams.video[0].codec_context
+    pixels = max(codec.width * codec.height, 1)
+    kept_pixels = min(pixels, settings.MAX_IMAGE_DIMENSION * settings.MAX_IMAGE_DIMENSION)
+    return {
+        # Decoded frame, its RGB conversion, and the decoder's reference frames
+        "decode": pixels * 3 * 4,
+        # Kept frames, their JPEG encodings and the copies handed to Tesseract
+        "frames": (top_k + 1) * kept_pixels * 3 * 3,
+    }
+
+def probe_video(fileobj: BinaryIO, top_k: int) -> Dict[str, int]:
+    """
+    Check that `fileobj` holds a video and estimate its decoding footprint.
+    The container is closed and the file rewound before returning.
+    """
+    container = open_video(fileobj)
+    try:
+        return estimate_video_footprint(container, top_k)
+    finally:
+        container.close()
+        fileobj.seek(0)
+
+def score_frame(frame: av.VideoFrame) -> float:
+    """Cheap sharpness x text-presence score for one decoded frame."""
+    height = max(1, round(frame.height * SCORE_WIDTH / max(frame.width, 1)))
+    gray = frame.reformat(width=SCORE_WIDTH, height=height, format="gray").to_ndarray()
+    return laplacian_variance(gray) * max_tile_contrast(gray) / 255.0
+
+def select_best_frames(
+    fileobj: BinaryIO,
+    top_k: int,
+    max_frames: int,
+    stride: int,
+    should_stop: Optional[Callable[[], bool]] = None,
+    min_gap: float = 0.0,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Decode a clip and keep the `top_k` highest-scoring frames that are at
+    least `min_gap` seconds apart.
+
+    Selection is greedy: a frame closer than `min_gap` to kept frames
+    replaces them only if it scores higher than all of them.
+
+    Args:
+        fileobj: Video file; opened and closed in the calling thread
+        top_k: Number of frames to keep
+        max_frames: Stop after decoding this many frames
+        stride: Score every stride-th decoded frame
+        should_stop: Checked before each frame; decoding ends early once it
+            returns True (e.g. the request was abandoned)
+        min_gap: Minimum time in seconds between kept frames
+
+    Returns:
+        Tuple of (kept frames best first, each {"frame_index", "time",
+        "score", "image"}; decoding stats)
+    """
+    container = open_video(fileobj)
+    stream = container.streams.video[0]
+    stream.thread_type = "AUTO"
+
+    # Frame times fall back to index / frame rate for streams without timestamps
+    frame_rate = float(stream.average_rate or 30)
+
+    # (score, frame_index, time, image) of the frames kept so far
+    kept: List[Tuple[float, int, float, Image.Image]] = []
+    decoded = 0
+    scored = 0
+
+    try:
+        for frame in container.decode(stream):
+            if should_stop is not None and should_stop():
+                break
+            index = decoded
+            decoded += 1
+            if index % stride == 0:
+                scored += 1
+                score = score_frame(frame)
+                time = float(frame.time) if frame.time is not None else index / frame_rate
+                nearby = [entry for entry in kept if abs(entry[2] - time) < min_gap]
+                if nearby:
+                    # Replaces its neighbours only if it beats all of them
+                    evicted = nearby if score > max(entry[0] for entry in nearby) else None
+                elif len(kept) < top_k:
+                    evicted = []
+                else:
+                    worst = min(kept)
+                    evicted = [worst] if score > worst[0] else None
+
+                if evicted is not None:
+                    # Only frames that make the cut are converted at full size
+                    image = frame.to_image()
+                    if max(image.size) > settings.MAX_IMAGE_DIMENSION:
+                        image.thumbnail(
+                            (settings.MAX_IMAGE_DIMENSION, settings.MAX_IMAGE_DIMENSION),
+                            Image.Resampling.LANCZOS,
+                        )
+                    evicted_indexes = {entry[1] for entry in evicted}
+                    kept = [entry for entry in kept if entry[1] not in evicted_indexes]
+                    kept.append((score, index, time, image))
+            if decoded >= max_frames:
+                break
+    finally:
+        container.close()
+
+    frames = [
+        {"frame_index": index, "time": round(time, 3), "score": round(score, 2), "image": image}
+        for score, index, time, image in sorted(kept, key=lambda entry: (-entry[0], entry[1]))
+    ]
+    stats = {"frames_decoded": decoded, "frames_scored": scored, "frames_selected": len(frames)}
+    return frames, stats
+
+def merge_classifications(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-frame classification results by averaging each label's score
+    over the frames that classified successfully.
+    """
+    successful = [result for result in results if result.get("status") == "success"]
+    if not successful:
+        return results[0] if results else {"status": "no_classification", "predictions": []}
+
+    totals: Dict[str, float] = {}
+    for result in successful:
+        for prediction in result.get("predictions", []):
+            label = prediction.get("label")
+            totals[label] = totals.get(label, 0.0) + prediction.get("score", 0)
+
+    predictions = sorted(
+        ({"label": label, "score": total / len(successful)} for label, total in totals.items()),
+        key=lambda prediction: prediction["score"],
+        reverse=True,
+    )
+    return {
+        "status": "success",
+        "predictions": predictions,
+        "top_prediction": predictions[0],
+        "confidence": predictions[0]["score"],
+    }
+
+def merge_device_info(infos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-frame OCR results by majority vote on each field.
+
+    `infos` must be ordered best frame first; ties go to the better frame.
+    Missing values (None, "Unknown") do not vote.
+
+    Returns:
+        device_info dictionary in the /identify format with the winning
+        values, the combined raw_text, and "votes" mapping each field to its
+        value counts. catalog_match_distance is the best frame's distance for
+        the winning model number.
+    """
+    merged: Dict[str, Any] = {}
+    votes: Dict[str, Dict[str, int]] = {}
+
+    for field in VOTED_FIELDS:
+        values = [info.get(field) for info in infos if info.get(field) not in (None, "Unknown")]
+        if not values:
+            merged[field] = "Unknown" if field == "product_type" else None
+            continue
+        counts = Counter(values)
+        # max() keeps the first value with the highest count, i.e. the best frame's
+        merged[field] = max(values, key=lambda value: counts[value])
+        votes[field] = dict(counts)
+
+    merged["catalog_match_distance"] = next(
+        (
+            info.get("catalog_match_distance")
+            for info in infos
+            if merged["model_number"] is not None and info.get("model_number") == merged["model_number"]
+        ),
+        None,
+    )
+
+    raw_text: List[str] = []
+    for info in infos:
+        for line in info.get("raw_text", []):
+            if line not in raw_text:
+                raw_text.append(line)
+
+    merged["raw_text"] = raw_text
+    merged["text_detections"] = len(raw_text)
+    merged["votes"] = votes
+    return merged